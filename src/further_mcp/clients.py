@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import httpx
+
+_CLIENT: httpx.AsyncClient | None = None
+
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client, creating it on first use."""
+
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(timeout=30, limits=_LIMITS, http2=True)
+    return _CLIENT
+
+
+async def close_shared_client() -> None:
+    """Close the shared client; the next call to get_shared_client opens a fresh one."""
+
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
@@ -3,16 +3,86 @@ from __future__ import annotations
 import asyncio
 import os
 import xml.etree.ElementTree as ET
-from datetime import datetime
-from typing import Sequence
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Sequence
 
 import httpx
+import orjson
 
-from .models import BookFormatLink, DiscoveryBook, DiscoveryResponse
+try:
+    from lxml import etree as LET
+except ImportError:  # pragma: no cover - lxml ships with the default install
+    LET = None
+
+from .cache import TTLCache
+from .clients import get_shared_client
+from .models import BookFormatLink, DiscoveryBook, DiscoveryResponse, DiscoveryResult
 from .tools import get_logger
 
 logger = get_logger(__name__)
 
+_ATOM_NS = {"a": "http://www.w3.org/2005/Atom"}
+_ATOM_ENTRY = "{http://www.w3.org/2005/Atom}entry"
+_REJECT_SUFFIXES = (".gif", ".jpg", ".jpeg", ".png", ".svg", ".zip.images")
+_DL_MIMES = frozenset({"application/epub+zip", "application/pdf"})
+if LET is not None:
+    _XP_TITLE = LET.XPath("string(a:title)", namespaces=_ATOM_NS, smart_strings=False)
+    _XP_AUTHORS = LET.XPath("a:author/a:name/text()", namespaces=_ATOM_NS, smart_strings=False)
+    _XP_SUMMARY = LET.XPath("string(a:summary)", namespaces=_ATOM_NS, smart_strings=False)
+    _XP_ID = LET.XPath("string(a:id)", namespaces=_ATOM_NS, smart_strings=False)
+    _XP_LINKS = LET.XPath("a:link", namespaces=_ATOM_NS)
+
+_CACHE_TTL = float(os.getenv("DISCOVERY_CACHE_TTL", "600"))
+_PAYLOAD_CACHE = TTLCache(maxsize=1024, ttl=_CACHE_TTL)
+_RESPONSE_CACHE = TTLCache(maxsize=1024, ttl=_CACHE_TTL)
+
+
+def clear_cache() -> None:
+    """Drop every cached upstream payload and parsed discovery response."""
+
+    _PAYLOAD_CACHE.clear()
+    _RESPONSE_CACHE.clear()
+
+
+def _params_key(params: dict[str, str] | None) -> tuple:
+    return tuple(sorted(params.items())) if params else ()
+
+
+def _opds_pull_parser() -> Any:
+    if LET is not None:
+        return LET.XMLPullParser(events=("end",), tag=_ATOM_ENTRY)
+    return ET.XMLPullParser(events=("end",))
+
+
+def _release_opds_entry(entry: Any) -> None:
+    """Free an entry that has been consumed, plus any siblings parsed before it."""
+
+    entry.clear()
+    if LET is not None:
+        parent = entry.getparent()
+        while entry.getprevious() is not None:
+            del parent[0]
+
+
+def _read_opds_entry(entry: Any) -> tuple[str | None, list[str], str | None, str | None, list[Any]]:
+    """Return the title, author names, summary, id and link elements of an OPDS entry."""
+
+    if LET is not None:
+        return (
+            _XP_TITLE(entry) or None,
+            _XP_AUTHORS(entry),
+            _XP_SUMMARY(entry) or None,
+            _XP_ID(entry) or None,
+            _XP_LINKS(entry),
+        )
+    return (
+        entry.findtext("a:title", default=None, namespaces=_ATOM_NS),
+        [author.findtext("a:name", namespaces=_ATOM_NS) for author in entry.findall("a:author", _ATOM_NS)],
+        entry.findtext("a:summary", default=None, namespaces=_ATOM_NS),
+        entry.findtext("a:id", namespaces=_ATOM_NS),
+        entry.findall("a:link", _ATOM_NS),
+    )
+
 
 class DiscoveryProvider:
     """Query multiple public-domain catalogs for downloadable EPUB/PDF links."""
@@ -22,35 +92,66 @@ class DiscoveryProvider:
         gutendex_url: str | None = None,
         openlibrary_url: str | None = None,
         standard_url: str | None = None,
+        client: httpx.AsyncClient | None = None,
     ):
+        self._client = client
+        self._inflight: dict[tuple, asyncio.Future[DiscoveryResult]] = {}
         self.gutendex_url = gutendex_url or os.getenv("GUTENDEX_BASE_URL", "https://gutendex.com/books/")
         self.openlibrary_url = openlibrary_url or os.getenv("OPENLIBRARY_SEARCH_URL", "https://openlibrary.org/search.json")
         self.archive_base = os.getenv("OPENARCHIVE_BASE_URL", "https://archive.org/download")
         self.standard_url = standard_url or os.getenv("STANDARD_EBOOKS_OPDS_URL", "https://standardebooks.org/opds")
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_shared_client()
+
     async def _fetch_json(self, url: str, params: dict[str, str] | None = None) -> dict:
-        async with httpx.AsyncClient(timeout=30) as client:
-            logger.debug("Discovery JSON request", url=url, params=params)
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+        return await _PAYLOAD_CACHE.get_or_set(
+            ("json", url, _params_key(params)),
+            lambda: self._request_json(url, params),
+        )
 
-    async def _fetch_xml(self, url: str, params: dict[str, str] | None = None) -> str:
-        async with httpx.AsyncClient(timeout=30) as client:
-            logger.debug("Discovery XML request", url=url, params=params)
-            response = await client.get(url, params=params, headers={"Accept": "application/atom+xml,application/xml"})
+    async def _request_json(self, url: str, params: dict[str, str] | None = None) -> dict:
+        logger.debug("Discovery JSON request", url=url, params=params)
+        response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    async def _stream_xml(self, url: str, params: dict[str, str] | None = None) -> AsyncIterator[bytes]:
+        logger.debug("Discovery XML stream", url=url, params=params)
+        headers = {"Accept": "application/atom+xml,application/xml"}
+        async with self.client.stream("GET", url, params=params, headers=headers) as response:
             response.raise_for_status()
-            return response.text
+            async for chunk in response.aiter_bytes():
+                yield chunk
+
+    async def _iter_opds_entries(self, params: dict[str, str]) -> AsyncIterator[Any]:
+        """Yield OPDS entries as soon as they are parsed; closing the iterator aborts the download."""
+
+        parser = _opds_pull_parser()
+        async with aclosing(self._stream_xml(self.standard_url, params)) as chunks:
+            async for chunk in chunks:
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if element.tag == _ATOM_ENTRY:
+                        yield element
+                        _release_opds_entry(element)
 
     def _build_gutendex_links(self, formats: dict[str, str]) -> list[BookFormatLink]:
         links: list[BookFormatLink] = []
         for media_type, url in formats.items():
-            if not url or url.endswith(".gif"):
+            if not url or url.endswith(_REJECT_SUFFIXES):
                 continue
             links.append(BookFormatLink(format=media_type, url=url))
         return links
 
     async def gutendex_search(self, query: str, limit: int = 5) -> DiscoveryResponse:
+        return await _RESPONSE_CACHE.get_or_set(
+            ("gutendex", self.gutendex_url, query, limit),
+            lambda: self._gutendex_search(query, limit),
+        )
+
+    async def _gutendex_search(self, query: str, limit: int) -> DiscoveryResponse:
         params = {"search": query, "page": "1"}
         payload = await self._fetch_json(self.gutendex_url, params)
         results = payload.get("results", [])[:limit]
@@ -83,6 +184,12 @@ class DiscoveryProvider:
         ]
 
     async def openlibrary_search(self, query: str, limit: int = 5) -> DiscoveryResponse:
+        return await _RESPONSE_CACHE.get_or_set(
+            ("openlibrary", self.openlibrary_url, query, limit),
+            lambda: self._openlibrary_search(query, limit),
+        )
+
+    async def _openlibrary_search(self, query: str, limit: int) -> DiscoveryResponse:
         params = {"q": query, "limit": str(limit)}
         payload = await self._fetch_json(self.openlibrary_url, params)
         docs = payload.get("docs", [])[:limit]
@@ -113,39 +220,40 @@ class DiscoveryProvider:
         )
 
     async def standard_ebooks_search(self, query: str, limit: int = 5) -> DiscoveryResponse:
+        return await _RESPONSE_CACHE.get_or_set(
+            ("standard-ebooks", self.standard_url, query, limit),
+            lambda: self._standard_ebooks_search(query, limit),
+        )
+
+    async def _standard_ebooks_search(self, query: str, limit: int) -> DiscoveryResponse:
         params = {"search": query}
-        xml_text = await self._fetch_xml(self.standard_url, params)
-        ns = {"atom": "http://www.w3.org/2005/Atom"}
-        root = ET.fromstring(xml_text)
-        entries = root.findall("atom:entry", ns)[:limit]
-        books = []
-        for entry in entries:
-            title = entry.findtext("atom:title", default=None, namespaces=ns)
-            authors = [
-                author.findtext("atom:name", namespaces=ns)
-                for author in entry.findall("atom:author", ns)
-                if author.findtext("atom:name", namespaces=ns)
-            ]
-            summary = entry.findtext("atom:summary", default=None, namespaces=ns)
-            download_links = []
-            for link in entry.findall("atom:link", ns):
-                rel = link.get("rel", "")
-                href = link.get("href")
-                mime = link.get("type")
-                if not href:
-                    continue
-                if "acquisition" in rel.lower() or mime in {"application/epub+zip", "application/pdf"}:
-                    download_links.append(BookFormatLink(format=mime or rel, url=href, label=rel))
-            books.append(
-                DiscoveryBook(
-                    title=title,
-                    authors=[a for a in authors if a],
-                    source="standard-ebooks",
-                    source_id=entry.findtext("atom:id", namespaces=ns),
-                    description=summary,
-                    download_links=download_links,
+        books: list[DiscoveryBook] = []
+        if limit <= 0:
+            return DiscoveryResponse(source="standard-ebooks", query=query, books=books, total_results=0)
+        async with aclosing(self._iter_opds_entries(params)) as entries:
+            async for entry in entries:
+                title, authors, summary, entry_id, links = _read_opds_entry(entry)
+                download_links = []
+                for link in links:
+                    rel = link.get("rel", "")
+                    href = link.get("href")
+                    mime = link.get("type")
+                    if not href:
+                        continue
+                    if "acquisition" in rel.lower() or mime in _DL_MIMES:
+                        download_links.append(BookFormatLink(format=mime or rel, url=href, label=rel))
+                books.append(
+                    DiscoveryBook(
+                        title=title,
+                        authors=[a for a in authors if a],
+                        source="standard-ebooks",
+                        source_id=entry_id,
+                        description=summary,
+                        download_links=download_links,
+                    )
                 )
-            )
+                if len(books) >= limit:
+                    break
         return DiscoveryResponse(source="standard-ebooks", query=query, books=books, total_results=len(books))
 
     async def discover_books(
@@ -153,7 +261,24 @@ class DiscoveryProvider:
         query: str,
         sources: Sequence[str] | None = None,
         limit: int = 5,
-    ) -> dict:
+    ) -> DiscoveryResult:
+        """Aggregate the requested sources; identical concurrent calls share one upstream fan-out."""
+
+        key = (query, tuple(sources or ()), limit)
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._discover_books(query, sources, limit))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield() keeps one cancelled waiter from cancelling the shared task.
+        return await asyncio.shield(pending)
+
+    async def _discover_books(
+        self,
+        query: str,
+        sources: Sequence[str] | None,
+        limit: int,
+    ) -> DiscoveryResult:
         if not sources:
             sources = ("gutendex", "openlibrary", "standard")
         tasks = []
@@ -170,5 +295,5 @@ class DiscoveryProvider:
             if isinstance(response, Exception):
                 logger.warning("Discovery source failed", error=str(response))
                 continue
-            results.append(response.model_dump())
-        return {"query": query, "responses": results, "timestamp": datetime.utcnow().isoformat()}
+            results.append(response)
+        return DiscoveryResult(query=query, responses=results)
@@ -1,20 +1,23 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
-from typing import List, Sequence
+from typing import AsyncIterator, List, Sequence
 
+import orjson
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.concurrency import run_in_threadpool
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, HttpUrl
 from fastapi.middleware.cors import CORSMiddleware
 
+from .clients import close_shared_client, get_shared_client
 from .discovery import DiscoveryProvider
+from .models import AuthorDetails, BookFormatLink, DiscoveryBook, DiscoveryResponse, DiscoveryResult, OpenLibrary
 from .pipeline import download_book, parse_book
 from .providers import OpenLibraryProvider
 from .tools import ebook_helper, pdf_helper, setup_logger, get_logger
@@ -26,10 +29,36 @@ setup_logger(level=os.getenv("LOG_LEVEL", "INFO"))
 LOGGER = get_logger(__name__)
 LOGGER.info("Starting Further MCP FastAPI module")
 
+DOWNLOAD_CONCURRENCY = int(os.getenv("DISCOVERY_CONCURRENCY", "8"))
+SSE_BATCH_SIZE = 8
+SSE_BATCH_DELAY = 0.05
+
+
+def _create_parse_pool() -> Executor:
+    """Executor for CPU-bound PDF/EPUB parsing, so books are parsed on all cores."""
+
+    return ProcessPoolExecutor(initializer=pdf_helper.mark_pool_worker)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    app.state.discovery_client = get_shared_client()
+    app.state.discovery_provider = DiscoveryProvider(client=app.state.discovery_client)
+    app.state.openlibrary_provider = OpenLibraryProvider(client=app.state.discovery_client)
+    app.state.download_semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    app.state.parse_pool = _create_parse_pool()
+    try:
+        yield
+    finally:
+        app.state.parse_pool.shutdown(wait=False, cancel_futures=True)
+        await close_shared_client()
+
+
 APP = FastAPI(
     title="Further-MCP",
     description="Combined ebook conversion and OpenLibrary search MCP.",
     version="0.1.0",
+    lifespan=_lifespan,
 )
 
 APP.add_middleware(
@@ -44,9 +73,18 @@ EBOOK_ROOT = Path(os.getenv("EBOOK_ROOT_PATH", "ebooks")).resolve()
 EBOOK_ROOT.mkdir(parents=True, exist_ok=True)
 
 
+def get_discovery_provider(request: Request) -> DiscoveryProvider:
+    return request.app.state.discovery_provider
+
+
+def get_openlibrary_provider(request: Request) -> OpenLibraryProvider:
+    return request.app.state.openlibrary_provider
+
+
 def resolve_ebook_path(relative_path: str) -> Path:
+    # Resolved on every request: a cached answer would outlive deleted files and re-pointed symlinks.
     candidate = (EBOOK_ROOT / relative_path).resolve()
-    if not str(candidate).startswith(str(EBOOK_ROOT)):
+    if not candidate.is_relative_to(EBOOK_ROOT):
         raise HTTPException(status_code=403, detail="File outside allowed path")
     if not candidate.exists():
         raise HTTPException(status_code=404, detail="File not found")
@@ -63,21 +101,21 @@ async def search_books(
     query: str = Query(..., min_length=1),
     keywords: Sequence[str] | None = Query(None),
     limit: int = Query(10, ge=1, le=50),
-) -> dict:
-    provider = OpenLibraryProvider()
+    provider: OpenLibraryProvider = Depends(get_openlibrary_provider),
+) -> OpenLibrary:
     try:
-        result = await provider.search_books(query, keywords=keywords, limit=limit)
-        return result.model_dump()
+        return await provider.search_books(query, keywords=keywords, limit=limit)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @APP.get("/search_author")
-async def search_author(query: str = Query(..., min_length=1)) -> dict:
-    provider = OpenLibraryProvider()
+async def search_author(
+    query: str = Query(..., min_length=1),
+    provider: OpenLibraryProvider = Depends(get_openlibrary_provider),
+) -> AuthorDetails:
     try:
-        result = await provider.search_author(query)
-        return result.model_dump()
+        return await provider.search_author(query)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
@@ -154,22 +192,32 @@ def _normalize_query_text(query: str) -> str:
     return normalized.strip()
 
 
-def _pick_download_url(download_links: list[dict] | list) -> str | None:
+# Most preferred first; the MIME forms ("application/pdf", ...) contain these tokens.
+_PRIORITY_TOKENS = ("pdf", "epub", "text/plain")
+
+
+def _pick_download_url(download_links: Sequence[BookFormatLink]) -> str | None:
     if not download_links:
         return None
-    priorities = ("pdf", "application/pdf", "epub", "application/epub+zip", "text/plain")
-    for pref in priorities:
-        for item in download_links:
-            fmt = str(item.get("format", "")).lower()
-            url = item.get("url")
-            if url and pref in fmt:
-                return str(url)
-    first = download_links[0]
-    return str(first.get("url")) if first.get("url") else None
+    best_rank = len(_PRIORITY_TOKENS)
+    best_url = None
+    for link in download_links:
+        if not link.url:
+            continue
+        fmt_l = link.format.lower()
+        for rank in range(best_rank):
+            if _PRIORITY_TOKENS[rank] in fmt_l:
+                best_rank, best_url = rank, link.url
+                break
+        if best_rank == 0:
+            break
+    if best_url is not None:
+        return best_url
+    return download_links[0].url or None
 
 
-def _sse_line(event: str, payload: dict) -> str:
-    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=True)}\n\n"
+def _sse_line(event: str, payload: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
 
 
 @APP.get("/discovery/search")
@@ -177,86 +225,172 @@ async def discovery_search(
     query: str = Query(..., min_length=1),
     sources: List[str] | None = Query(None),
     limit: int = Query(5, ge=1, le=20),
-) -> dict:
-    provider = DiscoveryProvider()
+    provider: DiscoveryProvider = Depends(get_discovery_provider),
+) -> DiscoveryResult:
     normalized = _normalize_sources(sources)
     return await provider.discover_books(query=query, sources=normalized, limit=limit)
 
 
 @APP.get("/discovery/gutendex")
-async def discovery_gutendex(query: str = Query(..., min_length=1), limit: int = Query(5, ge=1, le=20)) -> dict:
-    provider = DiscoveryProvider()
-    return (await provider.gutendex_search(query=query, limit=limit)).model_dump()
+async def discovery_gutendex(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(5, ge=1, le=20),
+    provider: DiscoveryProvider = Depends(get_discovery_provider),
+) -> DiscoveryResponse:
+    return await provider.gutendex_search(query=query, limit=limit)
 
 
 @APP.get("/discovery/openlibrary")
 async def discovery_openlibrary(
     query: str = Query(..., min_length=1),
     limit: int = Query(5, ge=1, le=20),
-) -> dict:
-    provider = DiscoveryProvider()
-    return (await provider.openlibrary_search(query=query, limit=limit)).model_dump()
+    provider: DiscoveryProvider = Depends(get_discovery_provider),
+) -> DiscoveryResponse:
+    return await provider.openlibrary_search(query=query, limit=limit)
 
 
 @APP.get("/discovery/standard-ebooks")
 async def discovery_standard_ebooks(
     query: str = Query(..., min_length=1),
     limit: int = Query(5, ge=1, le=20),
-) -> dict:
-    provider = DiscoveryProvider()
-    return (await provider.standard_ebooks_search(query=query, limit=limit)).model_dump()
+    provider: DiscoveryProvider = Depends(get_discovery_provider),
+) -> DiscoveryResponse:
+    return await provider.standard_ebooks_search(query=query, limit=limit)
 
 
 @APP.post("/pipeline/fetch-parse")
-def pipeline_fetch_parse(request: PipelineRequest) -> dict:
-    file_path = download_book(request.url, EBOOK_ROOT)
-    return parse_book(file_path, limit_pages=request.limit_pages, limit_chapters=request.limit_chapters)
+async def pipeline_fetch_parse(request: PipelineRequest) -> dict:
+    file_path = await download_book(str(request.url), EBOOK_ROOT)
+    return await asyncio.get_running_loop().run_in_executor(
+        APP.state.parse_pool,
+        parse_book,
+        file_path,
+        request.limit_pages,
+        request.limit_chapters,
+    )
 
 
 @APP.post("/pipeline/topic")
-async def pipeline_topic(request: TopicPipelineRequest) -> dict:
-    return await run_in_threadpool(_pipeline_topic_sync, request)
-
+async def pipeline_topic(
+    request: TopicPipelineRequest,
+    provider: DiscoveryProvider = Depends(get_discovery_provider),
+) -> dict:
+    return await _pipeline_topic(provider, request)
 
-def _pipeline_topic_sync(request: TopicPipelineRequest) -> dict:
-    provider = DiscoveryProvider()
-    query = _normalize_query_text(request.query)
-    normalized_sources = _normalize_sources(request.sources)
-    discovery = asyncio.run(provider.discover_books(query=query, sources=normalized_sources, limit=request.limit))
 
-    downloads: list[dict] = []
+def _topic_candidates(discovery: DiscoveryResult) -> list[tuple[str, DiscoveryBook, str]]:
+    candidates: list[tuple[str, DiscoveryBook, str]] = []
     seen_urls: set[str] = set()
-    for source_payload in discovery.get("responses", []):
-        for book in source_payload.get("books", []):
-            url = _pick_download_url(book.get("download_links", []))
+    for source_response in discovery.responses:
+        for book in source_response.books:
+            url = _pick_download_url(book.download_links)
             if not url or url in seen_urls:
                 continue
-            try:
-                file_path = download_book(url, EBOOK_ROOT)
-                parsed = parse_book(
-                    file_path,
-                    limit_pages=request.limit_pages,
-                    limit_chapters=request.limit_chapters,
-                )
-            except Exception as exc:
-                LOGGER.warning("Topic pipeline download failed", url=url, error=str(exc))
-                continue
-            downloads.append(
-                {
-                    "title": book.get("title"),
-                    "authors": book.get("authors", []),
-                    "source": source_payload.get("source"),
-                    "source_id": book.get("source_id"),
-                    "url": url,
-                    **parsed,
-                }
-            )
             seen_urls.add(url)
-            if len(downloads) >= request.download_limit:
-                break
-        if len(downloads) >= request.download_limit:
-            break
+            candidates.append((source_response.source, book, url))
+    return candidates
+
+
+async def _fetch_topic_book(source: str, book: DiscoveryBook, url: str, request: TopicPipelineRequest) -> dict | None:
+    async with APP.state.download_semaphore:
+        try:
+            file_path = await download_book(url, EBOOK_ROOT)
+            parsed = await asyncio.get_running_loop().run_in_executor(
+                APP.state.parse_pool,
+                parse_book,
+                file_path,
+                request.limit_pages,
+                request.limit_chapters,
+            )
+        except Exception as exc:
+            LOGGER.warning("Topic pipeline download failed", url=url, error=str(exc))
+            return None
+    return {
+        "title": book.title,
+        "authors": book.authors,
+        "source": source,
+        "source_id": book.source_id,
+        "url": url,
+        **parsed,
+    }
+
+
+async def _discover_topic_candidates(
+    provider: DiscoveryProvider,
+    request: TopicPipelineRequest,
+) -> tuple[str, list[tuple[str, DiscoveryBook, str]]]:
+    query = _normalize_query_text(request.query)
+    normalized_sources = _normalize_sources(request.sources)
+    discovery = await provider.discover_books(query=query, sources=normalized_sources, limit=request.limit)
+    return query, _topic_candidates(discovery)
+
+
+async def _iter_topic_download_batches(
+    request: TopicPipelineRequest,
+    candidates: list[tuple[str, DiscoveryBook, str]],
+    max_batch: int = SSE_BATCH_SIZE,
+    max_delay: float = SSE_BATCH_DELAY,
+) -> AsyncIterator[list[dict]]:
+    """Yield parsed books in small batches as they finish, stopping once ``download_limit`` succeeded.
+
+    A batch is flushed once it holds at least ``max_batch`` books, ``max_delay``
+    seconds after its first book arrived, or when the downloads run out.
+    Candidates are started lazily: at most DOWNLOAD_CONCURRENCY downloads, and
+    never more than could still be delivered, are in flight at once, so
+    reaching the limit does not cut running downloads short. Anything still
+    running when the consumer stops is cancelled.
+    """
+
+    remaining = iter(enumerate(candidates))
+    order: dict[asyncio.Task, int] = {}
+    pending: set[asyncio.Task] = set()
+    loop = asyncio.get_running_loop()
+    batch: list[dict] = []
+    deadline: float | None = None
+    delivered = 0
+
+    def schedule() -> None:
+        while len(pending) < min(DOWNLOAD_CONCURRENCY, request.download_limit - delivered):
+            candidate = next(remaining, None)
+            if candidate is None:
+                return
+            idx, (source, book, url) = candidate
+            task = asyncio.create_task(_fetch_topic_book(source, book, url, request))
+            order[task] = idx
+            pending.add(task)
 
+    try:
+        schedule()
+        while pending and delivered < request.download_limit:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            for task in sorted(done, key=order.__getitem__):
+                entry = task.result()
+                if entry is None:
+                    continue
+                batch.append(entry)
+                delivered += 1
+                if delivered >= request.download_limit:
+                    break
+            schedule()
+            if not batch:
+                continue
+            if deadline is None:
+                deadline = loop.time() + max_delay
+            if len(batch) >= max_batch or loop.time() >= deadline:
+                yield batch
+                batch, deadline = [], None
+        if batch:
+            yield batch
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _pipeline_topic(provider: DiscoveryProvider, request: TopicPipelineRequest) -> dict:
+    query, candidates = await _discover_topic_candidates(provider, request)
+    downloads = [entry async for batch in _iter_topic_download_batches(request, candidates) for entry in batch]
     return {"query": query, "downloads": downloads}
 
 
@@ -268,6 +402,7 @@ async def pipeline_topic_sse(
     download_limit: int = Query(30, ge=1, le=100),
     limit_pages: int = Query(3, ge=1, le=12),
     limit_chapters: int = Query(3, ge=1, le=12),
+    provider: DiscoveryProvider = Depends(get_discovery_provider),
 ) -> StreamingResponse:
     payload = TopicPipelineRequest(
         query=query,
@@ -280,11 +415,17 @@ async def pipeline_topic_sse(
 
     async def event_stream():
         yield _sse_line("start", {"query": _normalize_query_text(query), "limit": limit, "download_limit": download_limit})
-        result = await run_in_threadpool(_pipeline_topic_sync, payload)
-        for idx, entry in enumerate(result.get("downloads", []), start=1):
-            entry["index"] = idx
-            yield _sse_line("book", entry)
-        yield _sse_line("complete", {"query": result.get("query"), "count": len(result.get("downloads", []))})
+        normalized_query, candidates = await _discover_topic_candidates(provider, payload)
+        count = 0
+        async with aclosing(_iter_topic_download_batches(payload, candidates)) as batches:
+            async for batch in batches:
+                frames = []
+                for entry in batch:
+                    count += 1
+                    entry["index"] = count
+                    frames.append(_sse_line("book", entry))
+                yield b"".join(frames)
+        yield _sse_line("complete", {"query": normalized_query, "count": count})
 
     return StreamingResponse(
         event_stream(),
@@ -293,6 +434,7 @@ async def pipeline_topic_sse(
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
+            "Content-Encoding": "identity",
         },
     )
 
@@ -1,29 +1,41 @@
 from __future__ import annotations
 
+import asyncio
 import inspect
 import os
+from contextlib import asynccontextmanager
 from functools import wraps
 from pathlib import Path
 from typing import Sequence
 
+from dotenv import load_dotenv
 from fastmcp import FastMCP
 
+from .clients import close_shared_client
 from .discovery import DiscoveryProvider
 from .pipeline import download_book, parse_book
 from .providers import OpenLibraryProvider
-from .models import AuthorDetails, OpenLibrary
+from .models import AuthorDetails, DiscoveryResult, OpenLibrary
 from .tools import ebook_helper, pdf_helper, setup_logger, get_logger
 
+load_dotenv()
+
 setup_logger(level=os.getenv("LOG_LEVEL", "INFO"))
 LOGGER = get_logger(__name__)
 
-ROOT_PATH = Path.home() / "ebooks"
+# Same variable as the FastAPI layer; the MCP server is often launched from an
+# arbitrary working directory, so it keeps ~/ebooks as its default.
+ROOT_PATH = Path(os.getenv("EBOOK_ROOT_PATH", "~/ebooks")).expanduser().resolve()
 ROOT_PATH.mkdir(parents=True, exist_ok=True)
 
 
 def _resolve_path(path: str) -> Path:
-    candidate = (ROOT_PATH / path).resolve()
-    if not str(candidate).startswith(str(ROOT_PATH)):
+    # Containment is checked before existence, so callers cannot probe what exists outside ROOT_PATH.
+    try:
+        candidate = (ROOT_PATH / path).resolve()
+    except (OSError, RuntimeError):  # e.g. symlink loops
+        raise FileNotFoundError("Requested file does not exist.") from None
+    if not candidate.is_relative_to(ROOT_PATH):
         raise FileNotFoundError("Access to the requested file is not allowed.")
     if not candidate.exists():
         raise FileNotFoundError("Requested file does not exist.")
@@ -43,7 +55,18 @@ def _handle_file_operation(func):
     return wrapper
 
 
-MCP_APP = FastMCP(name="further-mcp", version="0.1.0")
+@asynccontextmanager
+async def _lifespan(app: FastMCP):
+    try:
+        yield {}
+    finally:
+        await close_shared_client()
+
+
+MCP_APP = FastMCP(name="further-mcp", version="0.1.0", lifespan=_lifespan)
+
+OPENLIBRARY_PROVIDER = OpenLibraryProvider()
+DISCOVERY_PROVIDER = DiscoveryProvider()
 
 
 @MCP_APP.tool()
@@ -53,23 +76,19 @@ async def search_books(
     limit: int = 10,
 ) -> OpenLibrary:
     LOGGER.info("search_books called", query=query, keywords=keywords, limit=limit)
-    provider = OpenLibraryProvider()
-    result = await provider.search_books(query, keywords=keywords, limit=limit)
-    return result
+    return await OPENLIBRARY_PROVIDER.search_books(query, keywords=keywords, limit=limit)
 
 
 @MCP_APP.tool()
 async def search_author(query: str) -> AuthorDetails:
     LOGGER.info("search_author called", query=query)
-    provider = OpenLibraryProvider()
-    return await provider.search_author(query)
+    return await OPENLIBRARY_PROVIDER.search_author(query)
 
 
 @MCP_APP.tool()
 async def search_author_with_book_name(query: str) -> AuthorDetails:
     LOGGER.info("search_author_with_book_name called", query=query)
-    provider = OpenLibraryProvider()
-    return await provider.search_author_with_book_name(query)
+    return await OPENLIBRARY_PROVIDER.search_author_with_book_name(query)
 
 
 @MCP_APP.tool()
@@ -77,21 +96,20 @@ async def discover_books(
     query: str,
     sources: Sequence[str] | None = None,
     limit: int = 5,
-) -> dict:
+) -> DiscoveryResult:
     LOGGER.info("discover_books called", query=query, sources=sources, limit=limit)
-    provider = DiscoveryProvider()
-    return await provider.discover_books(query=query, sources=sources, limit=limit)
+    return await DISCOVERY_PROVIDER.discover_books(query=query, sources=sources, limit=limit)
 
 
 @MCP_APP.tool()
-def fetch_and_parse_book(
+async def fetch_and_parse_book(
     url: str,
     limit_pages: int = 3,
     limit_chapters: int = 3,
 ) -> dict:
     LOGGER.info("fetch_and_parse_book called", url=url)
-    file_path = download_book(url, ROOT_PATH)
-    return parse_book(file_path, limit_pages=limit_pages, limit_chapters=limit_chapters)
+    file_path = await download_book(url, ROOT_PATH)
+    return await asyncio.to_thread(parse_book, file_path, limit_pages=limit_pages, limit_chapters=limit_chapters)
 
 
 @MCP_APP.tool()
@@ -1,37 +1,40 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any
+from datetime import datetime, timezone
+from typing import Annotated, Any
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+
+
+def _utc_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _first_item(value: Any) -> Any:
+    """OpenLibrary returns some scalar fields as lists; keep the first entry."""
+
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _clean_title(value: Any) -> str | None:
+    if value is None:
+        return None
+    return str(value).strip()
+
+
+_FIRST_ITEM = BeforeValidator(_first_item)
 
 
 class BookDetails(BaseModel):
     model_config = ConfigDict(extra="ignore", validate_default=True)
-    author_name: str | None = Field(None)
-    author_key: str | None = Field(None)
+    author_name: Annotated[str | None, _FIRST_ITEM] = Field(None)
+    author_key: Annotated[str | None, _FIRST_ITEM] = Field(None)
     edition_count: int | None = Field(None, ge=0)
     first_publish_year: int | None = Field(None, ge=1000, le=datetime.now().year + 1)
-    language: str | list[str] | None = Field(None)
-    title: str | None = Field(None)
-
-    @field_validator("author_name", "author_key", mode="before")
-    def ensure_string(cls, value: str | list[str] | None) -> str | None:
-        if isinstance(value, list):
-            return value[0] if value else None
-        return value
-
-    @field_validator("language", mode="before")
-    def normalize_language(cls, value: str | list[str] | None) -> str | None:
-        if isinstance(value, list):
-            return value[0] if value else None
-        return value
-
-    @field_validator("title", mode="before")
-    def clean_title(cls, value: Any) -> str | None:
-        if value is None:
-            return None
-        return str(value).strip()
+    language: Annotated[str | list[str] | None, _FIRST_ITEM] = Field(None)
+    title: Annotated[str | None, BeforeValidator(_clean_title)] = Field(None)
 
 
 class BookFormatLink(BaseModel):
@@ -56,7 +59,13 @@ class DiscoveryResponse(BaseModel):
     query: str
     total_results: int | None = None
     books: list[DiscoveryBook] = Field(default_factory=list)
-    timestamp: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    timestamp: str = Field(default_factory=_utc_timestamp)
+
+
+class DiscoveryResult(BaseModel):
+    query: str
+    responses: list[DiscoveryResponse] = Field(default_factory=list)
+    timestamp: str = Field(default_factory=_utc_timestamp)
 
 
 class OpenLibrary(BaseModel):
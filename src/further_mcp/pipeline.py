@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import mimetypes
 from pathlib import Path
@@ -8,12 +9,14 @@ from urllib.parse import urlparse
 from uuid import uuid4
 
 import httpx
-import fitz
 
+from .clients import get_shared_client
 from .tools import ebook_helper, pdf_helper, get_logger
 
 logger = get_logger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
 
 def _guess_extension(url: str, headers: dict[str, str]) -> str:
     parsed = urlparse(url)
@@ -25,18 +28,27 @@ def _guess_extension(url: str, headers: dict[str, str]) -> str:
     return ext or ".bin"
 
 
-def download_book(url: str, root: Path) -> Path:
+async def download_book(url: str, root: Path, client: httpx.AsyncClient | None = None) -> Path:
     destination_dir = root / "downloaded"
     destination_dir.mkdir(parents=True, exist_ok=True)
-    with httpx.Client(timeout=60) as client:
-        with client.stream("GET", url) as response:
-            response.raise_for_status()
-            suffix = _guess_extension(url, response.headers)
-            base_name = Path(urlparse(url).name or "book")
-            file_path = destination_dir / f"{uuid4().hex}_{base_name}{suffix}"
-            with file_path.open("wb") as handle:
-                for chunk in response.iter_bytes(8192):
-                    handle.write(chunk)
+    client = client or get_shared_client()
+    async with client.stream("GET", url, timeout=60) as response:
+        response.raise_for_status()
+        suffix = _guess_extension(url, response.headers)
+        base_name = Path(urlparse(url).path).stem or "book"
+        file_path = destination_dir / f"{uuid4().hex}_{base_name}{suffix}"
+        # Disk writes go through a worker thread so a slow disk never stalls the event loop.
+        handle = await asyncio.to_thread(file_path.open, "wb")
+        try:
+            try:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(handle.write, chunk)
+            finally:
+                await asyncio.to_thread(handle.close)
+        except BaseException:
+            # Failed or cancelled downloads must not leave a truncated book behind.
+            file_path.unlink(missing_ok=True)
+            raise
     logger.info("Downloaded book to disk", file_path=str(file_path))
     return file_path
 
@@ -54,13 +66,7 @@ def parse_book(file_path: Path, limit_pages: int = 3, limit_chapters: int = 3) -
     suffix = file_path.suffix.lower()
     summary = ""
     if suffix == ".pdf":
-        doc = fitz.open(file_path)
-        total_pages = doc.page_count
-        doc.close()
-        texts = [
-            pdf_helper.extract_page_text(str(file_path), page + 1)
-            for page in range(min(limit_pages, total_pages))
-        ]
+        texts = pdf_helper.extract_first_pages_text(str(file_path), limit_pages)
         summary = _collect_text(texts, limit_pages)
         fmt = "pdf"
     elif suffix in {".epub", ".opf"}:
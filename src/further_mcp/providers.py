@@ -1,52 +1,73 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 from typing import Sequence
 
 import httpx
+from pydantic import TypeAdapter
 
+from .cache import TTLCache
+from .clients import get_shared_client
 from .models import AuthorDetails, AuthorWorks, OpenLibrary
 
 logger = logging.getLogger(__name__)
 
+SYNONYMS = {"intro": "introduction", "updated": "latest", "python": "python"}
+
+_WORKS_ADAPTER = TypeAdapter(list[AuthorWorks])
+
+_CACHE = TTLCache(maxsize=256, ttl=float(os.getenv("OPENLIBRARY_CACHE_TTL", "300")))
+
+
+def clear_cache() -> None:
+    """Drop every cached OpenLibrary response."""
+
+    _CACHE.clear()
+
 
 class OpenLibraryProvider:
     """Bridge to the OpenLibrary APIs with keyword-aware query building."""
 
-    def __init__(self, base_url: str | None = None):
+    def __init__(self, base_url: str | None = None, client: httpx.AsyncClient | None = None):
         self.base_url = base_url or os.getenv("OPENLIBRARY_BASE_URL", "https://openlibrary.org")
+        self._client = client
         logger.info("Initialized OpenLibraryProvider with %s", self.base_url)
 
-    def _build_query(self, query: str, keywords: Sequence[str] | None = None) -> str:
-        tokens = []
-        normalized = []
-
-        if query.strip():
-            tokens.append(query.strip())
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_shared_client()
 
-        if keywords:
-            tokens.extend([token.strip() for token in keywords if token.strip()])
+    def _build_query(self, query: str, keywords: Sequence[str] | None = None) -> str:
+        query = query.strip()
+        if not keywords:
+            lowered = query.lower()
+            return SYNONYMS.get(lowered, lowered)
 
-        synonyms = {"intro": "introduction", "updated": "latest", "python": "python"}
-        seen = set()
+        tokens = [query] if query else []
+        tokens.extend(stripped for token in keywords if (stripped := token.strip()))
 
+        # A dict keeps first-seen order while dropping repeats.
+        normalized: dict[str, None] = {}
         for token in tokens:
-            normalized_token = synonyms.get(token.lower(), token.lower())
-            if normalized_token not in seen:
-                seen.add(normalized_token)
-                normalized.append(normalized_token)
-
+            lowered = token.lower()
+            normalized.setdefault(SYNONYMS.get(lowered, lowered), None)
         return " ".join(normalized)
 
     async def _get_json(self, path: str, params: dict[str, str]) -> dict:
+        key = (self.base_url, path, tuple(sorted(params.items())))
+        data = await _CACHE.get_or_set(key, lambda: self._request_json(path, params))
+        # Callers add defaults to the payload, so hand out a copy of the cached dict.
+        return dict(data)
+
+    async def _request_json(self, path: str, params: dict[str, str]) -> dict:
         url = f"{self.base_url}{path}"
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            logger.debug("Calling OpenLibrary API: %s with params %s", url, params)
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+        logger.debug("Calling OpenLibrary API: %s with params %s", url, params)
+        response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
 
     async def search_books(self, query: str, keywords: Sequence[str] | None = None, limit: int = 15) -> OpenLibrary:
         refined_query = self._build_query(query, keywords)
@@ -61,9 +82,12 @@ class OpenLibraryProvider:
             raise ValueError("No books found for query.")
         author_id = books.docs[0].author_key or books.docs[0].author_name
         author_id = author_id or ""
-        data = await self._get_json(f"/authors/{author_id}.json", {})
+        data, works = await asyncio.gather(
+            self._get_json(f"/authors/{author_id}.json", {}),
+            self.search_author_works(author_id),
+        )
         author = AuthorDetails(**data)
-        author.works = await self.search_author_works(author_id)
+        author.works = works
         return author
 
     async def search_author(self, query: str) -> AuthorDetails:
@@ -79,4 +103,4 @@ class OpenLibraryProvider:
     async def search_author_works(self, author_id: str) -> list[AuthorWorks]:
         data = await self._get_json(f"/authors/{author_id}/works.json", {})
         entries = data.get("entries", [])
-        return [AuthorWorks(**entry) for entry in entries[:10]]
+        return _WORKS_ADAPTER.validate_python(entries[:10])
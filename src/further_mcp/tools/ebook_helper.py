@@ -1,16 +1,42 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Dict, Union, Any
+from typing import TYPE_CHECKING, Callable, List, Tuple, Dict, Union, Any
 import os
-from bs4 import BeautifulSoup, Comment
-from html2text import HTML2Text
-
-from ebooklib import epub
+import posixpath
+import threading
+import zipfile
+from collections import OrderedDict
+from urllib.parse import unquote
+import lxml.html
+from lxml import etree
 
 from .logger_config import get_logger, log_operation
 
+if TYPE_CHECKING:
+    from ebooklib import epub
+
+# ebooklib and html2text are imported inside the functions that
+# use them, so importing this module (and the servers) stays cheap.
+
 logger = get_logger(__name__)
 
+_STRIP_TAGS = ("script", "style", "img", "svg", "iframe", "video", "nav")
+_STRIP_XPATH = etree.XPath("|".join(f"//{tag}" for tag in _STRIP_TAGS))
+_PARSERS = threading.local()
+_ASCII_SPACES = " \n\t\f\r"
+
+_EPUB_CACHE_SIZE = 8
+_EPUB_CACHE: "OrderedDict[Tuple[str, str, int, int], Any]" = OrderedDict()
+_EPUB_CACHE_LOCK = threading.Lock()
+
+_CONTAINER_ROOTFILE = "{urn:oasis:names:tc:opendocument:xmlns:container}rootfile"
+_OPF_NS = "http://www.idpf.org/2007/opf"
+_DC_NS = "http://purl.org/dc/elements/1.1/"
+_NCX_NS = "http://www.daisy.org/z3986/2005/ncx/"
+
+# DC metadata values by element name, plus the flattened (title, href) TOC.
+EpubPackage = Tuple[Dict[str, List[Union[str, None]]], List[Tuple[str, str]]]
+
 
 class EpubProcessingError(Exception):
     """Detailed errors raised during EPUB processing."""
@@ -28,33 +54,196 @@ def _ensure_exists(path: str) -> None:
         raise FileNotFoundError(f"EPUB file not found: {path}")
 
 
+def _cached_by_stat(kind: str, epub_path: str, load: Callable[[str], Any]) -> Any:
+    """Return ``load(epub_path)``, recomputing it only when the file's mtime or size changed."""
+
+    stat = os.stat(epub_path)
+    key = (kind, epub_path, stat.st_mtime_ns, stat.st_size)
+    with _EPUB_CACHE_LOCK:
+        value = _EPUB_CACHE.get(key)
+        if value is not None:
+            _EPUB_CACHE.move_to_end(key)
+            return value
+    value = load(epub_path)
+    with _EPUB_CACHE_LOCK:
+        _EPUB_CACHE[key] = value
+        _EPUB_CACHE.move_to_end(key)
+        while len(_EPUB_CACHE) > _EPUB_CACHE_SIZE:
+            _EPUB_CACHE.popitem(last=False)
+    return value
+
+
+def _load_epub(epub_path: str) -> epub.EpubBook:
+    from ebooklib import epub
+
+    return epub.read_epub(epub_path)
+
+
+def _read_epub_cached(epub_path: str) -> epub.EpubBook:
+    return _cached_by_stat("book", epub_path, _load_epub)
+
+
+def _xml_parser() -> etree.XMLParser:
+    parser = getattr(_PARSERS, "xml_parser", None)
+    if parser is None:
+        parser = _PARSERS.xml_parser = etree.XMLParser(recover=True, resolve_entities=False)
+    return parser
+
+
+def _read_member(archive: zipfile.ZipFile, name: str) -> bytes:
+    return archive.read(posixpath.normpath(name))
+
+
+def _nav_toc(content: bytes, base_path: str) -> List[Tuple[str, str]]:
+    tree = lxml.html.document_fromstring(content, parser=_html_parser())
+    entries: List[Tuple[str, str]] = []
+
+    def _collect(list_node: Any) -> None:
+        for item_node in list_node.findall("li"):
+            sublist_node = item_node.find("ol")
+            link_node = item_node.find("a")
+            href = link_node.get("href") if link_node is not None else None
+            if sublist_node is not None:
+                title = item_node[0].text_content()
+                entries.append((title, posixpath.normpath(posixpath.join(base_path, href)) if href else ""))
+                _collect(sublist_node)
+            elif href:
+                entries.append((link_node.text_content(), posixpath.normpath(posixpath.join(base_path, href))))
+
+    _collect(tree.xpath("//nav[@*='toc']")[0].find("ol"))
+    return entries
+
+
+def _ncx_toc(content: bytes) -> List[Tuple[str, str]]:
+    nav_map = etree.fromstring(content, _xml_parser()).find(f"{{{_NCX_NS}}}navMap")
+    entries: List[Tuple[str, str]] = []
+
+    def _collect(element: Any) -> None:
+        for nav_point in element.iterchildren(f"{{{_NCX_NS}}}navPoint"):
+            label, src = "", ""
+            for child in nav_point:
+                if child.tag == f"{{{_NCX_NS}}}navLabel":
+                    label = child[0].text
+                elif child.tag == f"{{{_NCX_NS}}}content":
+                    src = child.get("src", "")
+            entries.append((label, src))
+            _collect(nav_point)
+
+    _collect(nav_map)
+    return entries
+
+
+def _read_package(epub_path: str) -> EpubPackage:
+    """Read metadata and TOC from container.xml, the OPF and the nav/NCX file only.
+
+    Mirrors what ebooklib reports for these fields without decompressing any
+    chapter, image or font in the archive.
+    """
+
+    with zipfile.ZipFile(epub_path) as archive:
+        container = etree.fromstring(archive.read("META-INF/container.xml"), _xml_parser())
+        opf_path = [
+            rootfile.get("full-path")
+            for rootfile in container.iter(_CONTAINER_ROOTFILE)
+            if rootfile.get("media-type") == "application/oebps-package+xml"
+        ][-1]
+        opf_dir = posixpath.dirname(opf_path)
+        package = etree.fromstring(_read_member(archive, opf_path), _xml_parser())
+
+        metadata: Dict[str, List[Union[str, None]]] = {}
+        for element in package.find(f"{{{_OPF_NS}}}metadata"):
+            if isinstance(element.tag, str) and element.tag.startswith(f"{{{_DC_NS}}}"):
+                metadata.setdefault(element.tag[len(_DC_NS) + 2 :], []).append(element.text)
+
+        items = package.find(f"{{{_OPF_NS}}}manifest").iterchildren(f"{{{_OPF_NS}}}item")
+        manifest = {item.get("id"): item for item in items}
+        nav = next(
+            (
+                item
+                for item in manifest.values()
+                if item.get("media-type") == "application/xhtml+xml" and "nav" in item.get("properties", "").split(" ")
+            ),
+            None,
+        )
+        ncx_id = package.find(f"{{{_OPF_NS}}}spine").get("toc", "")
+        if nav is not None:
+            content = _read_member(archive, posixpath.join(opf_dir, nav.get("href")))
+            toc = _nav_toc(content, posixpath.dirname(unquote(nav.get("href"))))
+        elif ncx_id:
+            toc = _ncx_toc(_read_member(archive, posixpath.join(opf_dir, unquote(manifest[ncx_id].get("href")))))
+        else:
+            toc = []
+    return metadata, toc
+
+
+def _package_from_book(epub_path: str) -> EpubPackage:
+    book = _read_epub_cached(epub_path)
+    metadata = {tag: [value for value, _ in values] for tag, values in book.metadata.get(_DC_NS, {}).items()}
+    toc: List[Tuple[str, str]] = []
+
+    def _collect(items):
+        for item in items:
+            if isinstance(item, tuple):
+                link, children = item
+                toc.append((link.title, link.href))
+                _collect(children)
+            else:
+                toc.append((item.title, item.href))
+
+    _collect(book.toc)
+    return metadata, toc
+
+
+def _load_package(epub_path: str) -> EpubPackage:
+    try:
+        return _read_package(epub_path)
+    except Exception as exc:
+        # Unpacked directories and unusual packages go through ebooklib's full reader.
+        logger.debug("Falling back to full EPUB parse", file_path=epub_path, error_details=str(exc))
+        return _package_from_book(epub_path)
+
+
+def _read_package_cached(epub_path: str) -> EpubPackage:
+    return _cached_by_stat("package", epub_path, _load_package)
+
+
+def clear_cache() -> None:
+    """Forget every cached EPUB."""
+
+    with _EPUB_CACHE_LOCK:
+        _EPUB_CACHE.clear()
+
+
+def _reset_after_fork() -> None:
+    # A lock held by another thread at fork time would stay locked forever in the child.
+    global _EPUB_CACHE_LOCK
+    _EPUB_CACHE_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
 @log_operation("epub_listing")
 def get_all_epub_files(directory: str) -> List[str]:
-    return [entry for entry in os.listdir(directory) if entry.lower().endswith(".epub")]
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.name[-5:].lower() == ".epub" and entry.is_file()]
 
 
 @log_operation("epub_metadata_extraction")
 def get_meta(epub_path: str) -> Dict[str, Union[str, List[str]]]:
     _ensure_exists(epub_path)
-    book = epub.read_epub(epub_path)
+    dc_metadata, _ = _read_package_cached(epub_path)
     meta: Dict[str, Union[str, List[str]]] = {}
 
-    for key, attr in {
-        "title": "title",
-        "language": "language",
-        "identifier": "identifier",
-        "date": "date",
-        "publisher": "publisher",
-        "description": "description",
-    }.items():
-        values = book.get_metadata("DC", attr)
-        if values and values[0]:
-            meta[key] = values[0][0]
+    for key in ("title", "language", "identifier", "date", "publisher", "description"):
+        values = dc_metadata.get(key)
+        if values:
+            meta[key] = values[0]
 
     for key in ("creator", "contributor", "subject"):
-        values = book.get_metadata("DC", key)
+        values = dc_metadata.get(key)
         if values:
-            meta[key] = [item[0] for item in values if item]
+            meta[key] = list(values)
 
     logger.info("Collected EPUB metadata", file_path=epub_path, metadata_fields=list(meta.keys()))
     return meta
@@ -63,36 +252,36 @@ def get_meta(epub_path: str) -> Dict[str, Union[str, List[str]]]:
 @log_operation("epub_toc_extraction")
 def get_toc(epub_path: str) -> List[Tuple[str, str]]:
     _ensure_exists(epub_path)
-    book = epub.read_epub(epub_path)
-    toc_entries: List[Tuple[str, str]] = []
-
-    def _collect(items):
-        for item in items:
-            if isinstance(item, tuple):
-                link, children = item
-                toc_entries.append((link.title, link.href))
-                _collect(children)
-            else:
-                toc_entries.append((item.title, item.href))
-
-    _collect(book.toc)
+    _, toc = _read_package_cached(epub_path)
+    toc_entries = list(toc)
     logger.info("Extracted EPUB TOC entries", file_path=epub_path, chapter_count=len(toc_entries))
     return toc_entries
 
 
-def _clean_html(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style", "img", "svg", "iframe", "video", "nav"]):
-        tag.decompose()
-    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-        comment.extract()
-    for tag in soup.find_all():
-        if not tag.get_text(strip=True) and not tag.find("img") and tag.name not in ("br",):
-            tag.decompose()
-    return str(soup)
+def _html_parser() -> lxml.html.HTMLParser:
+    # lxml parsers must not be shared between threads, so keep one per thread.
+    parser = getattr(_PARSERS, "parser", None)
+    if parser is None:
+        parser = _PARSERS.parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+    return parser
+
+
+def _clean_tree(tree: lxml.html.HtmlElement) -> lxml.html.HtmlElement | None:
+    """Strip scripts, media, navigation and empty tags in place; None if no text is left."""
+
+    for element in _STRIP_XPATH(tree):
+        element.drop_tree()
+    if not tree.text_content().strip():
+        return None
+    for element in list(tree.iter()):
+        if element is not tree and element.tag != "br" and not element.text_content().strip():
+            element.drop_tree()
+    return tree
 
 
 def _convert_html_to_markdown(html: str) -> str:
+    from html2text import HTML2Text
+
     converter = HTML2Text()
     converter.ignore_links = False
     converter.ignore_images = False
@@ -102,12 +291,16 @@ def _convert_html_to_markdown(html: str) -> str:
 @log_operation("epub_chapter_conversion")
 def extract_chapter_markdown(epub_path: str, chapter_href: str) -> str:
     _ensure_exists(epub_path)
-    book = epub.read_epub(epub_path)
-    html = _extract_chapter_html(book, chapter_href, epub_path)
-    return _convert_html_to_markdown(html)
+    book = _read_epub_cached(epub_path)
+    tree = _extract_chapter_tree(book, chapter_href, epub_path)
+    if tree is None:
+        return _convert_html_to_markdown("")
+    return _convert_html_to_markdown(lxml.html.tostring(tree, encoding="unicode"))
 
 
-def _extract_chapter_html(book: Any, chapter_href: str, epub_path: str) -> str:
+def _extract_chapter_tree(book: Any, chapter_href: str, epub_path: str) -> lxml.html.HtmlElement | None:
+    """Parse a chapter (or the part of it from an anchor onwards) once and return it cleaned."""
+
     if "#" in chapter_href:
         href, anchor = chapter_href.split("#", 1)
     else:
@@ -117,22 +310,39 @@ def _extract_chapter_html(book: Any, chapter_href: str, epub_path: str) -> str:
     if item is None:
         raise EpubProcessingError(f"Chapter not found: {href}", file_path=epub_path, operation="chapter_lookup")
 
-    soup = BeautifulSoup(item.get_content(), "html.parser")
+    try:
+        tree = lxml.html.document_fromstring(item.get_content(), parser=_html_parser())
+    except (etree.ParserError, ValueError):
+        tree = None
+
     if anchor:
-        element = soup.find(id=anchor)
+        element = tree.get_element_by_id(anchor, None) if tree is not None else None
         if element is None:
             raise EpubProcessingError(f"Anchor not found: {anchor}", file_path=epub_path, operation="chapter_lookup")
-        fragments = [str(element)]
-        for node in element.find_all_next():
-            fragments.append(str(node))
-        return _clean_html("\n".join(fragments))
+        # The anchor, everything after it at its own level, then everything after each
+        # enclosing element, moved in document order into a fresh document.
+        section = [element, *element.itersiblings()]
+        for ancestor in element.iterancestors():
+            if ancestor.tag in ("body", "html"):
+                break
+            section.extend(ancestor.itersiblings())
+        tree = lxml.html.Element("html")
+        body = etree.SubElement(tree, "body")
+        for node in section:
+            body.append(node)
 
-    return _clean_html(str(soup))
+    return _clean_tree(tree) if tree is not None else None
 
 
 def extract_chapter_plain_text(epub_path: str, chapter_href: str) -> str:
     _ensure_exists(epub_path)
-    book = epub.read_epub(epub_path)
-    html = _extract_chapter_html(book, chapter_href, epub_path)
-    plain = BeautifulSoup(html, "html.parser").get_text(separator="\n")
-    return plain.strip()
+    book = _read_epub_cached(epub_path)
+    tree = _extract_chapter_tree(book, chapter_href, epub_path)
+    if tree is None:
+        return ""
+    # Like BeautifulSoup's get_text("\n"), whitespace-only runs collapse to one newline or space.
+    parts = [
+        text if text.strip(_ASCII_SPACES) else ("\n" if "\n" in text else " ")
+        for text in tree.itertext()
+    ]
+    return "\n".join(parts).strip()
@@ -1,20 +1,34 @@
 import logging
-import json
 import os
 import time
-from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 from functools import wraps
 import traceback
 
+import orjson
+
+_EXTRA_FIELDS = ("file_path", "operation", "duration_ms", "page_count", "chapter_count", "error_type", "error_details")
+_MISSING = object()
+
 
 class StructuredFormatter(logging.Formatter):
     """Structured JSON formatter for easier log ingestion."""
 
+    _second = -1
+    _second_text = ""
+
+    def _timestamp(self, created: float) -> str:
+        # strftime runs once per second; records within the same second reuse the prefix.
+        second = int(created)
+        if second != self._second:
+            self._second_text = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+            self._second = second
+        return f"{self._second_text}.{int((created - second) * 1000):03d}"
+
     def format(self, record: logging.LogRecord) -> str:
         payload = {
-            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -22,17 +36,18 @@ class StructuredFormatter(logging.Formatter):
             "function": record.funcName,
             "line": record.lineno,
         }
-        extras = ["file_path", "operation", "duration_ms", "page_count", "chapter_count", "error_type", "error_details"]
-        for key in extras:
-            if hasattr(record, key):
-                payload[key] = getattr(record, key)
+        fields = record.__dict__
+        for key in _EXTRA_FIELDS:
+            value = fields.get(key, _MISSING)
+            if value is not _MISSING:
+                payload[key] = value
         if record.exc_info:
             payload["exception"] = {
                 "type": record.exc_info[0].__name__,
                 "message": str(record.exc_info[1]),
                 "traceback": traceback.format_exception(*record.exc_info),
             }
-        return json.dumps(payload, ensure_ascii=False, default=str)
+        return orjson.dumps(payload, default=str).decode()
 
 
 class StructuredLogger:
@@ -59,15 +74,25 @@ class StructuredLogger:
 
 
 def setup_logger(level: str = "INFO", log_file: str = "further_mcp.log") -> logging.Logger:
-    """Configure both structured file logging and readable console output."""
+    """Configure both structured file logging and readable console output.
+
+    Safe to call more than once: later calls only update the level instead of
+    reopening the log file and rebuilding the handlers.
+    """
+
+    level_value = getattr(logging, level.upper())
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level_value)
+    console_handler = getattr(root_logger, "_further_mcp_console", None)
+    if console_handler is not None and console_handler in root_logger.handlers:
+        console_handler.setLevel(level_value)
+        return root_logger
 
     log_dir = Path(os.getenv("FURTHER_MCP_LOG_DIR", "/tmp/further_mcp_logs"))
     log_dir.mkdir(parents=True, exist_ok=True)
 
     log_path = log_dir / log_file
 
-    root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, level.upper()))
     for handler in list(root_logger.handlers):
         root_logger.removeHandler(handler)
 
@@ -80,10 +105,11 @@ def setup_logger(level: str = "INFO", log_file: str = "further_mcp.log") -> logg
 
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(console)
-    stream_handler.setLevel(getattr(logging, level.upper()))
+    stream_handler.setLevel(level_value)
 
     root_logger.addHandler(file_handler)
     root_logger.addHandler(stream_handler)
+    root_logger._further_mcp_console = stream_handler  # type: ignore[attr-defined]
 
     return root_logger
 
@@ -112,7 +138,3 @@ def log_operation(operation_name: str):
         return wrapper
 
     return decorator
-
-
-# ensure we have a default logger configuration upon import
-setup_logger()
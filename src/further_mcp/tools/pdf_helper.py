@@ -1,14 +1,61 @@
 from __future__ import annotations
 
-from typing import List, Tuple, Dict, Union
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Tuple, Dict, Union, Sequence
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import cache, wraps
+import copy
+from itertools import repeat
 import os
-
-import fitz  # PyMuPDF
+import threading
 
 from .logger_config import get_logger, log_operation
 
+if TYPE_CHECKING:
+    import fitz
+
 logger = get_logger(__name__)
 
+# How extract_pages_text spreads work, by number of pages requested. Up to
+# ``sequential_max_pages`` the process pool costs more than it saves; up to
+# ``batched_max_pages`` pages go out in ``batch_size`` chunks so workers stay
+# evenly loaded; beyond that each worker gets one contiguous share.
+PAGE_EXTRACTION_RULES: Dict[str, int] = {
+    "sequential_max_pages": 10,
+    "batched_max_pages": 200,
+    "batch_size": 10,
+}
+
+# Span styling for extract_page_markdown; the flags are fitz.TEXT_FONT_BOLD / TEXT_FONT_ITALIC.
+_HEADING_SIZE = 14
+_BOLD_FLAG = 16
+_ITALIC_FLAG = 2
+
+_PAGE_POOL: ProcessPoolExecutor | None = None
+# Set in process-pool workers (see mark_pool_worker) so they never start a nested page pool.
+_IN_POOL_WORKER = False
+_PAGE_POOL_LOCK = threading.Lock()
+
+_DOC_CACHE_SIZE = 32
+# Each entry pairs a document with its own lock: PyMuPDF is not thread-safe, so a document's lock is
+# held while it is in use, and _DOC_LOCK only guards the LRU bookkeeping.
+_DOC_CACHE: "OrderedDict[Tuple[str, int, int], Tuple[fitz.Document, threading.RLock]]" = OrderedDict()
+_DOC_LOCK = threading.Lock()
+
+_RESULT_CACHE_SIZE = 256
+_RESULT_CACHE: "OrderedDict[Tuple[str, str, int, int], Any]" = OrderedDict()
+_RESULT_LOCK = threading.Lock()
+
+
+@cache
+def _fitz():
+    """Import PyMuPDF on first use so servers that never touch a PDF skip its load time."""
+
+    import fitz  # PyMuPDF
+
+    return fitz
+
 
 class PdfProcessingError(Exception):
     """Detailed errors raised during PDF processing."""
@@ -21,106 +68,310 @@ class PdfProcessingError(Exception):
         super().__init__(f"{message} (file={file_path}, operation={operation})")
 
 
-def _ensure_exists(path: str) -> None:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"PDF file not found: {path}")
+def _stat_pdf(path: str) -> os.stat_result:
+    """Stat ``path`` once, both to check it exists and to key the caches on its mtime and size."""
+
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"PDF file not found: {path}") from None
+
+
+@contextmanager
+def _open_document(pdf_path: str, stat: os.stat_result | None = None) -> Iterator[fitz.Document]:
+    """Yield an open document from the LRU cache, reopening it only when the file changed."""
+
+    if stat is None:
+        stat = _stat_pdf(pdf_path)
+    key = (pdf_path, stat.st_mtime_ns, stat.st_size)
+    while True:
+        evicted = []
+        with _DOC_LOCK:
+            entry = _DOC_CACHE.get(key)
+            if entry is None or entry[0].is_closed:
+                evicted = [_DOC_CACHE.pop(cached) for cached in list(_DOC_CACHE) if cached[0] == pdf_path]
+                entry = _DOC_CACHE[key] = (_fitz().open(pdf_path), threading.RLock())
+                while len(_DOC_CACHE) > _DOC_CACHE_SIZE:
+                    evicted.append(_DOC_CACHE.popitem(last=False)[1])
+            else:
+                _DOC_CACHE.move_to_end(key)
+        _close_documents(evicted)
+        doc, lock = entry
+        with lock:
+            # Another thread may have evicted and closed the entry before we got its lock; reopen then.
+            if not doc.is_closed:
+                yield doc
+                return
+
+
+def _close_documents(entries: List[Tuple[fitz.Document, threading.RLock]]) -> None:
+    # Runs outside _DOC_LOCK and waits for each document's current reader to finish.
+    for doc, lock in entries:
+        with lock:
+            doc.close()
+
+
+def clear_cache() -> None:
+    """Close and forget every cached document and memoized result."""
+
+    with _DOC_LOCK:
+        entries = list(_DOC_CACHE.values())
+        _DOC_CACHE.clear()
+    _close_documents(entries)
+    with _RESULT_LOCK:
+        _RESULT_CACHE.clear()
+
+
+def _memoized_by_stat(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Memoize a per-file result until the file's mtime or size changes.
+
+    The wrapped function receives the wrapper's stat as ``_stat`` so a cache miss does not stat the file again.
+    """
+
+    @wraps(func)
+    def wrapper(pdf_path: str, **kwargs: Any) -> Any:
+        stat = _stat_pdf(pdf_path)
+        key = (func.__name__, pdf_path, stat.st_mtime_ns, stat.st_size, tuple(sorted(kwargs.items())))
+        with _RESULT_LOCK:
+            if key in _RESULT_CACHE:
+                _RESULT_CACHE.move_to_end(key)
+                return copy.copy(_RESULT_CACHE[key])
+        result = func(pdf_path, _stat=stat, **kwargs)
+        with _RESULT_LOCK:
+            _RESULT_CACHE[key] = result
+            while len(_RESULT_CACHE) > _RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
+        return copy.copy(result)
+
+    return wrapper
+
+
+def _reset_after_fork() -> None:
+    # A forked child must not share the parent's file handles or a lock held by another thread.
+    global _DOC_CACHE, _DOC_LOCK, _RESULT_LOCK
+    _DOC_CACHE = OrderedDict()
+    _DOC_LOCK = threading.Lock()
+    _RESULT_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def iter_pdf_files(directory: str) -> Iterator[str]:
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name[-4:].lower() == ".pdf" and entry.is_file():
+                yield entry.name
 
 
 @log_operation("pdf_listing")
 def get_all_pdf_files(directory: str) -> List[str]:
-    return [entry for entry in os.listdir(directory) if entry.lower().endswith(".pdf")]
+    return list(iter_pdf_files(directory))
 
 
 @log_operation("pdf_metadata_extraction")
-def get_meta(pdf_path: str) -> Dict[str, Union[str, int, bool]]:
-    _ensure_exists(pdf_path)
-    doc = fitz.open(pdf_path)
-    meta = {k: v for k, v in doc.metadata.items() if v}
-    meta["pages"] = doc.page_count
-    meta["file_size"] = os.path.getsize(pdf_path)
-    try:
-        meta["pdf_version"] = f"{doc.version_major}.{doc.version_minor}"
-    except AttributeError:
-        meta["pdf_version"] = str(getattr(doc, "version", "unknown"))
-    meta["is_encrypted"] = doc.is_encrypted
-    if doc.page_count:
-        rect = doc[0].rect
-        meta["page_width"] = rect.width
-        meta["page_height"] = rect.height
-    doc.close()
+@_memoized_by_stat
+def get_meta(
+    pdf_path: str, *, include_layout: bool = True, _stat: os.stat_result | None = None
+) -> Dict[str, Union[str, int, bool]]:
+    """Collect document metadata; ``include_layout=False`` skips loading the first page for its size."""
+
+    stat = _stat or _stat_pdf(pdf_path)
+    with _open_document(pdf_path, stat) as doc:
+        meta = {k: v for k, v in doc.metadata.items() if v}
+        page_count = doc.page_count
+        try:
+            pdf_version = f"{doc.version_major}.{doc.version_minor}"
+        except AttributeError:
+            pdf_version = str(getattr(doc, "version", "unknown"))
+        meta.update(
+            pages=page_count,
+            file_size=stat.st_size,
+            pdf_version=pdf_version,
+            is_encrypted=doc.is_encrypted,
+        )
+        if include_layout and page_count:
+            rect = doc[0].rect
+            meta.update(page_width=rect.width, page_height=rect.height)
     logger.info("Collected PDF metadata", file_path=pdf_path, metadata_fields=list(meta.keys()))
     return meta
 
 
 @log_operation("pdf_toc_extraction")
-def get_toc(pdf_path: str) -> List[Tuple[str, int]]:
-    _ensure_exists(pdf_path)
-    doc = fitz.open(pdf_path)
-    toc_data = doc.get_toc()
-    doc.close()
+@_memoized_by_stat
+def get_toc(pdf_path: str, *, _stat: os.stat_result | None = None) -> List[Tuple[str, int]]:
+    with _open_document(pdf_path, _stat) as doc:
+        toc_data = doc.get_toc()
     return [(title, page) for _, title, page in toc_data]
 
 
 def extract_page_text(pdf_path: str, page_number: int) -> str:
-    _ensure_exists(pdf_path)
-    doc = fitz.open(pdf_path)
+    with _open_document(pdf_path) as doc:
+        try:
+            return doc[page_number - 1].get_text()
+        except Exception as exc:
+            raise PdfProcessingError("Failed to extract page text", pdf_path, "page_text", exc)
+
+
+def mark_pool_worker() -> None:
+    """ProcessPoolExecutor initializer: page extraction in this worker stays inline instead of nesting a pool."""
+
+    global _IN_POOL_WORKER
+    _IN_POOL_WORKER = True
+
+
+def _page_pool() -> ProcessPoolExecutor:
+    global _PAGE_POOL
+    if _IN_POOL_WORKER:
+        raise RuntimeError("The page pool cannot be started from inside a pool worker")
+    with _PAGE_POOL_LOCK:
+        if _PAGE_POOL is None:
+            _PAGE_POOL = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=mark_pool_worker)
+    return _PAGE_POOL
+
+
+def _extract_pages_from_open_doc(doc: fitz.Document, page_numbers: Sequence[int]) -> List[str]:
+    return [doc[page_number - 1].get_text() for page_number in page_numbers]
+
+
+def extract_first_pages_text(pdf_path: str, limit_pages: int) -> List[str]:
+    """Text of the first ``limit_pages`` pages, read inline through a single open document.
+
+    This is the pipeline's summary path, which already runs inside a parse worker, so it never uses the page pool.
+    """
+
+    with _open_document(pdf_path) as doc:
+        page_numbers = range(1, min(limit_pages, doc.page_count) + 1)
+        try:
+            return _extract_pages_from_open_doc(doc, page_numbers)
+        except Exception as exc:
+            raise PdfProcessingError("Failed to extract page text", pdf_path, "page_text", exc)
+
+
+def _extract_page_batch(pdf_path: str, page_numbers: Sequence[int]) -> List[str]:
+    # Runs in a pool worker, whose own document cache keeps the file open between batches.
+    with _open_document(pdf_path) as doc:
+        return _extract_pages_from_open_doc(doc, page_numbers)
+
+
+def _plan_page_batches(page_numbers: List[int]) -> List[List[int]] | None:
+    """Split pages into pool batches following PAGE_EXTRACTION_RULES, or None to read inline."""
+
+    # Pool workers (ours or a caller's, like the FastAPI parse pool) read inline rather than nest another pool.
+    if _IN_POOL_WORKER:
+        return None
+    workers = os.cpu_count() or 1
+    count = len(page_numbers)
+    if workers <= 1 or count <= PAGE_EXTRACTION_RULES["sequential_max_pages"]:
+        return None
+    if count <= PAGE_EXTRACTION_RULES["batched_max_pages"]:
+        batch_size = PAGE_EXTRACTION_RULES["batch_size"]
+    else:
+        batch_size = -(-count // workers)
+    return [page_numbers[start : start + batch_size] for start in range(0, count, batch_size)]
+
+
+def extract_pages_text(pdf_path: str, page_numbers: Sequence[int]) -> List[str]:
+    """Extract several pages at once, using the process pool only when the request is large enough."""
+
+    stat = _stat_pdf(pdf_path)
+    page_numbers = list(page_numbers)
+    batches = _plan_page_batches(page_numbers)
     try:
-        text = doc[page_number - 1].get_text()
+        if batches is None:
+            with _open_document(pdf_path, stat) as opened:
+                return _extract_pages_from_open_doc(opened, page_numbers)
+        results = _page_pool().map(_extract_page_batch, repeat(pdf_path), batches)
+        return [text for batch in results for text in batch]
     except Exception as exc:
         raise PdfProcessingError("Failed to extract page text", pdf_path, "page_text", exc)
-    finally:
-        doc.close()
-    return text
+
+
+def _page_blocks(doc: fitz.Document, page_number: int) -> List[Dict[str, Any]]:
+    fitz = _fitz()
+    # Image blocks carry the full image bytes and are never rendered here, so leave them out.
+    text_flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    return doc[page_number - 1].get_text("dict", flags=text_flags)["blocks"]
+
+
+def _blocks_to_markdown(blocks: List[Dict[str, Any]]) -> str:
+    lines: List[str] = []
+    for block in blocks:
+        for line in block["lines"]:
+            parts = []
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if not text:
+                    continue
+                flags = span["flags"]
+                if flags & _ITALIC_FLAG:
+                    text = f"*{text}*"
+                # Headings are set in bold anyway, so only body text gets the ** wrapping.
+                if span["size"] > _HEADING_SIZE:
+                    text = "## " + text
+                elif flags & _BOLD_FLAG:
+                    text = f"**{text}**"
+                parts.append(text)
+            if parts:
+                lines.append(" ".join(parts))
+    return "\n".join(lines)
 
 
 def extract_page_markdown(pdf_path: str, page_number: int) -> str:
-    _ensure_exists(pdf_path)
-    doc = fitz.open(pdf_path)
+    with _open_document(pdf_path) as doc:
+        blocks = _page_blocks(doc, page_number)
+    return _blocks_to_markdown(blocks)
+
+
+def _extract_markdown_batch(pdf_path: str, page_numbers: Sequence[int]) -> List[str]:
+    # Runs in a pool worker, like _extract_page_batch.
+    with _open_document(pdf_path) as doc:
+        return [_blocks_to_markdown(_page_blocks(doc, page_number)) for page_number in page_numbers]
+
+
+def extract_pages_markdown(pdf_path: str, page_numbers: Sequence[int]) -> Dict[int, str]:
+    """Markdown for several pages keyed by page number, batched over the page pool like extract_pages_text."""
+
+    stat = _stat_pdf(pdf_path)
+    page_numbers = list(page_numbers)
+    batches = _plan_page_batches(page_numbers)
     try:
-        page = doc[page_number - 1]
-        blocks = page.get_text("dict")["blocks"]
-        lines = []
-        for block in blocks:
-            if "lines" in block:
-                for line in block["lines"]:
-                    text_parts = []
-                    for span in line["spans"]:
-                        text = span["text"].strip()
-                        if not text:
-                            continue
-                        size = span.get("size", 0)
-                        flags = span.get("flags", 0)
-                        if size > 14:
-                            text = f"## {text}"
-                        if flags & 2**3:
-                            text = f"**{text}**"
-                        if flags & 2**1:
-                            text = f"*{text}*"
-                        text_parts.append(text)
-                    if text_parts:
-                        lines.append(" ".join(text_parts))
-        return "\n".join(lines)
-    finally:
-        doc.close()
+        if batches is None:
+            with _open_document(pdf_path, stat) as doc:
+                page_blocks = [_page_blocks(doc, page_number) for page_number in page_numbers]
+            texts = [_blocks_to_markdown(blocks) for blocks in page_blocks]
+        else:
+            results = _page_pool().map(_extract_markdown_batch, repeat(pdf_path), batches)
+            texts = [text for batch in results for text in batch]
+    except Exception as exc:
+        raise PdfProcessingError("Failed to extract page markdown", pdf_path, "page_markdown", exc)
+    return dict(zip(page_numbers, texts))
+
+
+@_memoized_by_stat
+def _chapter_index(pdf_path: str, *, _stat: os.stat_result | None = None) -> Tuple[Tuple[str, int], ...]:
+    """TOC entries with casefolded titles, so repeated chapter lookups don't re-fold every title."""
+
+    return tuple((title.casefold(), page) for title, page in get_toc(pdf_path))
 
 
 def extract_chapter_by_title(pdf_path: str, chapter_title: str) -> Tuple[str, List[int]]:
-    toc = get_toc(pdf_path)
+    toc = _chapter_index(pdf_path)
+    needle = chapter_title.casefold()
     start_page = None
     end_page = None
     for idx, (title, page) in enumerate(toc):
-        if chapter_title.lower() in title.lower():
+        if needle in title:
             start_page = page
             if idx + 1 < len(toc):
                 end_page = toc[idx + 1][1]
             break
     if start_page is None:
         raise PdfProcessingError("Chapter not found", pdf_path, "chapter_lookup")
-    doc = fitz.open(pdf_path)
-    last_page = doc.page_count
-    doc.close()
-    end_page = end_page or last_page
-    pages = []
-    for page_num in range(start_page, end_page):
-        pages.append(extract_page_text(pdf_path, page_num))
-    return ("\n".join(pages), list(range(start_page, end_page)))
+    if end_page is None:
+        with _open_document(pdf_path) as doc:
+            end_page = doc.page_count
+    page_numbers = list(range(start_page, end_page))
+    # Outside the document lock, so a long chapter's pool fan-out doesn't block other readers.
+    pages = extract_pages_text(pdf_path, page_numbers)
+    return ("\n".join(pages), page_numbers)
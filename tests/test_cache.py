@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from further_mcp.cache import TTLCache
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_runs_factory_once_for_concurrent_misses():
+    cache = TTLCache()
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*(cache.get_or_set("key", factory) for _ in range(5)))
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache._locks == {} and cache._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_keeps_the_lock_while_callers_are_queued():
+    cache = TTLCache()
+    calls = running = peak = 0
+
+    async def factory():
+        nonlocal calls, running, peak
+        calls += 1
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if calls == 1:
+            raise RuntimeError("first attempt fails")
+        return "value"
+
+    first = asyncio.create_task(cache.get_or_set("key", factory))
+    queued = asyncio.create_task(cache.get_or_set("key", factory))
+    await asyncio.wait([first])
+    assert isinstance(first.exception(), RuntimeError)
+    # Arrives after the first caller released the lock but before the queued one woke up.
+    late = asyncio.create_task(cache.get_or_set("key", factory))
+
+    assert await asyncio.gather(queued, late) == ["value", "value"]
+    assert peak == 1
+    assert calls == 2
+    assert cache._locks == {} and cache._waiters == {}
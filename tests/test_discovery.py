@@ -1,9 +1,20 @@
+import asyncio
+
+import httpx
 import pytest
 
-from further_mcp.discovery import DiscoveryProvider
+from further_mcp import discovery
+from further_mcp.discovery import DiscoveryProvider, clear_cache
 from further_mcp.models import DiscoveryResponse
 
 
+@pytest.fixture(autouse=True)
+def _reset_discovery_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
 @pytest.mark.asyncio
 async def test_gutendex_search_parses_formats(monkeypatch):
     provider = DiscoveryProvider()
@@ -20,6 +31,8 @@ async def test_gutendex_search_parses_formats(monkeypatch):
                     "formats": {
                         "application/epub+zip": "https://example.com/book.epub",
                         "text/plain; charset=utf-8": "https://example.com/book.txt",
+                        "image/jpeg": "https://example.com/cover.medium.jpg",
+                        "application/octet-stream": "https://example.com/book.zip.images",
                     },
                     "subjects": ["AI"],
                 }
@@ -34,6 +47,7 @@ async def test_gutendex_search_parses_formats(monkeypatch):
     book = response.books[0]
     assert book.download_links
     assert any(link.format.startswith("application/epub") for link in book.download_links)
+    assert not any(link.url.endswith((".jpg", ".zip.images")) for link in book.download_links)
 
 
 @pytest.mark.asyncio
@@ -62,7 +76,10 @@ async def test_openlibrary_search_adds_archive_links(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_standard_ebooks_parses_opds(monkeypatch):
+@pytest.mark.parametrize("use_lxml", [True, False])
+async def test_standard_ebooks_parses_opds(monkeypatch, use_lxml):
+    if not use_lxml:
+        monkeypatch.setattr(discovery, "LET", None)
     provider = DiscoveryProvider()
     sample_feed = """
         <feed xmlns="http://www.w3.org/2005/Atom">
@@ -76,16 +93,45 @@ async def test_standard_ebooks_parses_opds(monkeypatch):
         </feed>
     """
 
-    async def fake_fetch_xml(url, params=None):
-        return sample_feed
+    async def fake_stream_xml(url, params=None):
+        payload = sample_feed.encode()
+        yield payload[:120]
+        yield payload[120:]
 
-    monkeypatch.setattr(provider, "_fetch_xml", fake_fetch_xml)
+    monkeypatch.setattr(provider, "_stream_xml", fake_stream_xml)
     response = await provider.standard_ebooks_search("fresh", limit=1)
     assert response.source == "standard-ebooks"
     assert response.books[0].title == "Fresh Title"
+    assert response.books[0].authors == ["Creator"]
     assert response.books[0].download_links[0].url.endswith(".epub")
 
 
+@pytest.mark.asyncio
+async def test_standard_ebooks_stops_streaming_after_limit(monkeypatch):
+    provider = DiscoveryProvider()
+    entry = '<entry><id>urn:{0}</id><title>Book {0}</title></entry>'
+    chunks = [b'<feed xmlns="http://www.w3.org/2005/Atom">']
+    chunks += [entry.format(idx).encode() for idx in range(5)]
+    chunks.append(b"</feed>")
+    consumed = []
+    closed = []
+
+    async def fake_stream_xml(url, params=None):
+        try:
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(provider, "_stream_xml", fake_stream_xml)
+    response = await provider.standard_ebooks_search("many", limit=2)
+
+    assert [book.title for book in response.books] == ["Book 0", "Book 1"]
+    assert len(consumed) == 3
+    assert closed == [True]
+
+
 @pytest.mark.asyncio
 async def test_discover_books_aggregates(monkeypatch):
     provider = DiscoveryProvider()
@@ -98,5 +144,60 @@ async def test_discover_books_aggregates(monkeypatch):
     monkeypatch.setattr(provider, "standard_ebooks_search", lambda query, limit: stub_response("standard-ebooks"))
 
     result = await provider.discover_books("any", sources=["gutendex", "openlibrary", "standard"], limit=1)
-    assert result["query"] == "any"
-    assert len(result["responses"]) == 3
+    assert result.query == "any"
+    assert [response.source for response in result.responses] == ["gutendex", "openlibrary", "standard-ebooks"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_json_uses_injected_client():
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, json={"count": 0, "results": []})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = DiscoveryProvider(client=client)
+        payload = await provider._fetch_json("https://gutendex.test/books/", {"search": "ai"})
+
+    assert payload["count"] == 0
+    assert seen == ["https://gutendex.test/books/?search=ai"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_is_served_from_cache():
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"count": 0, "results": []})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = DiscoveryProvider(gutendex_url="https://gutendex.test/books/", client=client)
+        first = await provider.gutendex_search("cached", limit=2)
+        second = await provider.gutendex_search("cached", limit=2)
+        await provider._fetch_json("https://gutendex.test/books/", {"page": "1", "search": "cached"})
+
+    assert first is second
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_discover_books_share_one_fanout(monkeypatch):
+    provider = DiscoveryProvider()
+    calls = []
+
+    async def slow_gutendex(query, limit):
+        calls.append(query)
+        await asyncio.sleep(0.01)
+        return DiscoveryResponse(source="gutendex", query=query)
+
+    monkeypatch.setattr(provider, "gutendex_search", slow_gutendex)
+    first, second = await asyncio.gather(
+        provider.discover_books("same", sources=["gutendex"], limit=1),
+        provider.discover_books("same", sources=["gutendex"], limit=1),
+    )
+
+    assert first is second
+    assert calls == ["same"]
+    assert provider._inflight == {}
@@ -0,0 +1,165 @@
+import os
+import threading
+
+import lxml.html
+import pytest
+from ebooklib import epub
+
+from further_mcp.tools import ebook_helper
+
+
+@pytest.fixture(autouse=True)
+def _clear_epub_cache():
+    ebook_helper.clear_cache()
+    yield
+    ebook_helper.clear_cache()
+
+
+@pytest.fixture
+def sample_epub(tmp_path):
+    book = epub.EpubBook()
+    book.set_identifier("id123")
+    book.set_title("Sample Book")
+    book.set_language("en")
+    book.add_author("Writer One")
+    chapter = epub.EpubHtml(title="Chapter One", file_name="text/ch1.xhtml", lang="en")
+    chapter.content = (
+        "<html><body><h1>Chapter One</h1><p>First para.</p>"
+        "<section><h2 id='part2'>Part Two</h2><p>Second para.</p></section>"
+        "<p>Tail para.</p></body></html>"
+    )
+    book.add_item(chapter)
+    book.toc = (
+        epub.Link("text/ch1.xhtml", "Chapter One", "ch1"),
+        epub.Link("text/ch1.xhtml#part2", "Part Two", "p2"),
+    )
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav", chapter]
+    path = tmp_path / "sample.epub"
+    epub.write_epub(str(path), book)
+    return str(path)
+
+
+def test_clean_tree_strips_noise_and_empty_tags():
+    html = (
+        "<html><head><style>p {}</style></head><body>"
+        "<h1>Title</h1><script>track()</script><!-- note -->"
+        "<p> </p><div><span></span></div><img src='a.png'/>"
+        "<p>Kept<br/>line</p><nav><p>menu</p></nav>"
+        "</body></html>"
+    )
+    tree = ebook_helper._clean_tree(lxml.html.document_fromstring(html, parser=ebook_helper._html_parser()))
+    cleaned = lxml.html.tostring(tree, encoding="unicode")
+
+    assert "<h1>Title</h1>" in cleaned
+    assert "<p>Kept<br>line</p>" in cleaned
+    for dropped in ("script", "style", "note", "<span", "<img", "menu", "<p> </p>"):
+        assert dropped not in cleaned
+
+
+def test_empty_chapter_yields_no_text():
+    class Item:
+        def get_content(self):
+            return b""
+
+    class Book:
+        def get_item_with_href(self, href):
+            return Item()
+
+    assert ebook_helper._extract_chapter_tree(Book(), "empty.xhtml", "book.epub") is None
+
+
+def test_read_epub_is_cached_until_file_changes(sample_epub, monkeypatch):
+    calls = []
+    read_epub = epub.read_epub
+
+    def counting_read(path, *args, **kwargs):
+        calls.append(path)
+        return read_epub(path, *args, **kwargs)
+
+    monkeypatch.setattr(epub, "read_epub", counting_read)
+
+    ebook_helper.extract_chapter_plain_text(sample_epub, "text/ch1.xhtml")
+    ebook_helper.extract_chapter_markdown(sample_epub, "text/ch1.xhtml#part2")
+    assert len(calls) == 1
+
+    stat = os.stat(sample_epub)
+    os.utime(sample_epub, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    ebook_helper.extract_chapter_plain_text(sample_epub, "text/ch1.xhtml")
+    assert len(calls) == 2
+
+
+def test_meta_and_toc_skip_the_full_book_parse(sample_epub, monkeypatch):
+    monkeypatch.setattr(epub, "read_epub", lambda *args, **kwargs: pytest.fail("full parse used"))
+
+    assert ebook_helper.get_meta(sample_epub) == {
+        "title": "Sample Book",
+        "language": "en",
+        "identifier": "id123",
+        "creator": ["Writer One"],
+    }
+    assert ebook_helper.get_toc(sample_epub) == [
+        ("Chapter One", "text/ch1.xhtml"),
+        ("Part Two", "text/ch1.xhtml#part2"),
+    ]
+
+
+def _ncx_only_epub(path):
+    book = epub.EpubBook()
+    book.set_identifier("ncx1")
+    book.set_title("Old Style")
+    book.add_author("First Author")
+    book.add_author("Second Author")
+    chapters = []
+    for index in range(1, 4):
+        chapter = epub.EpubHtml(title=f"Chapter {index}", file_name=f"ch{index}.xhtml")
+        chapter.content = f"<html><body><p>Body {index}</p></body></html>"
+        book.add_item(chapter)
+        chapters.append(chapter)
+    book.toc = (chapters[0], (epub.Section("Part", href="ch2.xhtml"), (chapters[1], chapters[2])))
+    book.add_item(epub.EpubNcx())
+    book.spine = chapters
+    epub.write_epub(str(path), book)
+    return str(path)
+
+
+@pytest.mark.parametrize("builder", ["sample", "ncx"])
+def test_package_reader_matches_ebooklib(builder, sample_epub, tmp_path):
+    path = sample_epub if builder == "sample" else _ncx_only_epub(tmp_path / "ncx.epub")
+
+    assert ebook_helper._read_package(path) == ebook_helper._package_from_book(path)
+
+
+def test_read_epub_cache_is_bounded(sample_epub, tmp_path, monkeypatch):
+    monkeypatch.setattr(ebook_helper, "_EPUB_CACHE_SIZE", 2)
+    for index in range(3):
+        copy = tmp_path / f"copy{index}.epub"
+        copy.write_bytes(open(sample_epub, "rb").read())
+        ebook_helper.get_meta(str(copy))
+
+    assert len(ebook_helper._EPUB_CACHE) == 2
+
+
+def test_anchored_chapter_starts_at_anchor_without_duplicates(sample_epub):
+    text = ebook_helper.extract_chapter_plain_text(sample_epub, "text/ch1.xhtml#part2")
+
+    assert text.startswith("Part Two")
+    assert "First para." not in text
+    assert text.count("Second para.") == 1
+    assert text.endswith("Tail para.")
+
+
+def test_missing_anchor_raises(sample_epub):
+    with pytest.raises(ebook_helper.EpubProcessingError):
+        ebook_helper.extract_chapter_markdown(sample_epub, "text/ch1.xhtml#nowhere")
+
+
+def test_fork_reset_replaces_held_locks(monkeypatch):
+    held = threading.Lock()
+    held.acquire()
+    monkeypatch.setattr(ebook_helper, "_EPUB_CACHE_LOCK", held)
+
+    ebook_helper._reset_after_fork()
+
+    assert not ebook_helper._EPUB_CACHE_LOCK.locked()
@@ -1,10 +1,16 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import httpx
 import pytest
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 import further_mcp.fastapi_server as fastapi_server
+from further_mcp import clients
+from further_mcp.models import BookFormatLink, DiscoveryBook, DiscoveryResponse, DiscoveryResult
 
 
 def test_resolve_ebook_path_within_root(tmp_path, monkeypatch):
@@ -27,9 +33,40 @@ def test_resolve_ebook_path_rejects_escape(tmp_path, monkeypatch):
     assert exc_info.value.status_code == 403
 
 
-def test_discovery_search_route(monkeypatch):
-    client = TestClient(fastapi_server.APP)
+def test_resolve_ebook_path_rejects_sibling_with_shared_prefix(tmp_path, monkeypatch):
+    root = tmp_path / "ebooks"
+    root.mkdir()
+    sibling = tmp_path / "ebooks_evil"
+    sibling.mkdir()
+    (sibling / "book.epub").write_text("content")
+    monkeypatch.setattr(fastapi_server, "EBOOK_ROOT", root)
+    with pytest.raises(HTTPException) as exc_info:
+        fastapi_server.resolve_ebook_path("../ebooks_evil/book.epub")
+    assert exc_info.value.status_code == 403
+
+
+def test_resolve_ebook_path_rechecks_deleted_and_relinked_files(tmp_path, monkeypatch):
+    root = tmp_path / "ebooks"
+    root.mkdir()
+    target = root / "book.pdf"
+    target.write_text("content")
+    outside = tmp_path / "secret.pdf"
+    outside.write_text("secret")
+    monkeypatch.setattr(fastapi_server, "EBOOK_ROOT", root)
+
+    assert fastapi_server.resolve_ebook_path("book.pdf") == target
+    target.unlink()
+    with pytest.raises(HTTPException) as exc_info:
+        fastapi_server.resolve_ebook_path("book.pdf")
+    assert exc_info.value.status_code == 404
+
+    target.symlink_to(outside)
+    with pytest.raises(HTTPException) as exc_info:
+        fastapi_server.resolve_ebook_path("book.pdf")
+    assert exc_info.value.status_code == 403
 
+
+def test_discovery_search_route(monkeypatch):
     async def fake_discover(self, query, sources, limit):
         return {"query": query, "responses": []}
 
@@ -38,6 +75,163 @@ def test_discovery_search_route(monkeypatch):
         fake_discover,
     )
 
-    response = client.get("/discovery/search", params={"query": "ai"})
+    with TestClient(fastapi_server.APP) as client:
+        response = client.get("/discovery/search", params={"query": "ai"})
     assert response.status_code == 200
     assert response.json()["query"] == "ai"
+
+
+def _link(fmt, name):
+    return BookFormatLink(format=fmt, url=f"https://x.test/{name}")
+
+
+def _stub_topic_pipeline(monkeypatch):
+    async def fake_discover(self, query, sources, limit):
+        books = [
+            DiscoveryBook(title="One", source="gutendex", download_links=[_link("application/epub+zip", "one.epub")]),
+            DiscoveryBook(title="Dup", source="gutendex", download_links=[_link("epub", "one.epub")]),
+            DiscoveryBook(title="Broken", source="gutendex", download_links=[_link("pdf", "broken.pdf")]),
+            DiscoveryBook(title="Two", source="gutendex", download_links=[_link("pdf", "two.pdf")]),
+        ]
+        return DiscoveryResult(query=query, responses=[DiscoveryResponse(source="gutendex", query=query, books=books)])
+
+    async def fake_download(url, root):
+        if "broken" in url:
+            raise RuntimeError("boom")
+        return Path(url.rsplit("/", 1)[-1])
+
+    def fake_parse(file_path, limit_pages, limit_chapters):
+        return {"relative_path": file_path.name, "format": file_path.suffix.lstrip("."), "size_bytes": 1, "summary": ""}
+
+    monkeypatch.setattr("further_mcp.fastapi_server.DiscoveryProvider.discover_books", fake_discover)
+    monkeypatch.setattr(fastapi_server, "download_book", fake_download)
+    monkeypatch.setattr(fastapi_server, "parse_book", fake_parse)
+    # The stubs are local functions, which a process pool cannot pickle.
+    monkeypatch.setattr(fastapi_server, "_create_parse_pool", lambda: ThreadPoolExecutor(max_workers=2))
+
+
+def test_pipeline_topic_downloads_unique_books(monkeypatch):
+    _stub_topic_pipeline(monkeypatch)
+
+    with TestClient(fastapi_server.APP) as client:
+        response = client.post("/pipeline/topic", json={"query": "python+intro"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == "python intro"
+    assert sorted(entry["relative_path"] for entry in body["downloads"]) == ["one.epub", "two.pdf"]
+
+
+def test_pipeline_topic_sse_streams_books(monkeypatch):
+    _stub_topic_pipeline(monkeypatch)
+
+    with TestClient(fastapi_server.APP) as client:
+        response = client.get("/pipeline/topic/sse", params={"query": "python"})
+
+    lines = response.text.splitlines()
+    events = [line.split(": ", 1)[1] for line in lines if line.startswith("event: ")]
+    payloads = [json.loads(line.split(": ", 1)[1]) for line in lines if line.startswith("data: ")]
+    assert events == ["start", "book", "book", "complete"]
+    assert [payload.get("index") for payload in payloads[1:3]] == [1, 2]
+    assert payloads[-1]["count"] == 2
+
+
+def test_pipeline_topic_stops_at_download_limit(monkeypatch):
+    _stub_topic_pipeline(monkeypatch)
+
+    with TestClient(fastapi_server.APP) as client:
+        response = client.post("/pipeline/topic", json={"query": "python", "download_limit": 1})
+
+    assert len(response.json()["downloads"]) == 1
+
+
+def test_pipeline_fetch_parse_downloads_and_parses(tmp_path, monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert str(request.url) == "https://books.test/files/notes.txt"
+        return httpx.Response(200, content=b"hello reader", headers={"content-type": "text/plain"})
+
+    monkeypatch.setattr(clients, "_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(fastapi_server, "EBOOK_ROOT", tmp_path)
+    monkeypatch.setattr(fastapi_server, "_create_parse_pool", lambda: ThreadPoolExecutor(max_workers=1))
+
+    with TestClient(fastapi_server.APP) as client:
+        response = client.post("/pipeline/fetch-parse", json={"url": "https://books.test/files/notes.txt"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["format"] == "txt"
+    assert body["summary"] == "hello reader"
+    assert (tmp_path / "downloaded" / body["relative_path"]).exists()
+
+
+def test_pick_download_url_prefers_pdf_then_epub():
+    links = [
+        _link("text/plain; charset=utf-8", "book.txt"),
+        _link("application/epub+zip", "book.epub"),
+        BookFormatLink(format="application/pdf", url=""),
+        _link("PDF", "book.pdf"),
+    ]
+    assert fastapi_server._pick_download_url(links) == "https://x.test/book.pdf"
+    assert fastapi_server._pick_download_url(links[:2]) == "https://x.test/book.epub"
+    assert fastapi_server._pick_download_url([_link("image/jpeg", "c.jpg")]) == "https://x.test/c.jpg"
+    assert fastapi_server._pick_download_url([]) is None
+
+
+def test_discovery_gutendex_route_serializes_model(monkeypatch):
+    async def fake_search(self, query, limit):
+        return DiscoveryResponse(source="gutendex", query=query, books=[DiscoveryBook(title="One", source="gutendex")])
+
+    monkeypatch.setattr("further_mcp.fastapi_server.DiscoveryProvider.gutendex_search", fake_search)
+
+    with TestClient(fastapi_server.APP) as client:
+        response = client.get("/discovery/gutendex", params={"query": "ai"})
+
+    assert response.status_code == 200
+    assert response.json()["books"][0]["title"] == "One"
+
+
+@pytest.mark.asyncio
+async def test_topic_downloads_are_batched(monkeypatch):
+    _stub_topic_pipeline(monkeypatch)
+    monkeypatch.setattr(fastapi_server.APP.state, "download_semaphore", asyncio.Semaphore(8), raising=False)
+    monkeypatch.setattr(fastapi_server.APP.state, "parse_pool", ThreadPoolExecutor(max_workers=2), raising=False)
+    request = fastapi_server.TopicPipelineRequest(query="python")
+    candidates = [("gutendex", DiscoveryBook(title=name, source="gutendex"), f"https://x.test/{name}.pdf") for name in "abc"]
+
+    batches = [batch async for batch in fastapi_server._iter_topic_download_batches(request, candidates, max_delay=5)]
+
+    assert [[entry["title"] for entry in batch] for batch in batches] == [["a", "b", "c"]]
+
+
+@pytest.mark.asyncio
+async def test_topic_downloads_only_start_what_can_be_delivered(monkeypatch):
+    _stub_topic_pipeline(monkeypatch)
+    started = []
+    fake_download = fastapi_server.download_book
+
+    async def tracking_download(url, root):
+        started.append(url)
+        return await fake_download(url, root)
+
+    monkeypatch.setattr(fastapi_server, "download_book", tracking_download)
+    monkeypatch.setattr(fastapi_server.APP.state, "download_semaphore", asyncio.Semaphore(8), raising=False)
+    monkeypatch.setattr(fastapi_server.APP.state, "parse_pool", ThreadPoolExecutor(max_workers=2), raising=False)
+    request = fastapi_server.TopicPipelineRequest(query="python", download_limit=2)
+    candidates = [("gutendex", DiscoveryBook(title=name, source="gutendex"), f"https://x.test/{name}.pdf") for name in "abcde"]
+
+    batches = [batch async for batch in fastapi_server._iter_topic_download_batches(request, candidates, max_delay=0)]
+
+    assert [entry["title"] for batch in batches for entry in batch] == ["a", "b"]
+    assert started == ["https://x.test/a.pdf", "https://x.test/b.pdf"]
+
+
+def test_parse_pool_workers_read_pdf_pages_inline():
+    from further_mcp.tools import pdf_helper
+
+    pool = fastapi_server._create_parse_pool()
+    try:
+        assert pool.submit(pdf_helper._plan_page_batches, list(range(1, 500))).result() is None
+        with pytest.raises(RuntimeError, match="pool worker"):
+            pool.submit(pdf_helper._page_pool).result()
+    finally:
+        pool.shutdown()
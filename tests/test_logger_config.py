@@ -0,0 +1,50 @@
+import json
+import logging
+
+from further_mcp.tools.logger_config import StructuredFormatter
+
+
+def _record(**extra):
+    record = logging.LogRecord("further_mcp.test", logging.INFO, __file__, 10, "hello %s", ("café",), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_structured_formatter_emits_json_with_known_extras():
+    payload = json.loads(StructuredFormatter().format(_record(file_path="/a.epub", duration_ms=1.5, unrelated="x")))
+
+    assert payload["message"] == "hello café"
+    assert payload["file_path"] == "/a.epub"
+    assert payload["duration_ms"] == 1.5
+    assert "unrelated" not in payload
+    assert len(payload["timestamp"]) == len("2024-01-01T00:00:00.000")
+
+
+def test_structured_formatter_stringifies_unknown_types():
+    payload = json.loads(StructuredFormatter().format(_record(operation={1, 2})))
+
+    assert payload["operation"] == str({1, 2})
+
+
+def test_setup_logger_is_idempotent(tmp_path, monkeypatch):
+    from further_mcp.tools.logger_config import setup_logger
+
+    monkeypatch.setenv("FURTHER_MCP_LOG_DIR", str(tmp_path))
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    monkeypatch.delattr(root, "_further_mcp_console", raising=False)
+    try:
+        setup_logger("INFO")
+        handlers = list(root.handlers)
+        setup_logger("DEBUG")
+
+        assert root.handlers == handlers
+        assert root.level == logging.DEBUG
+        assert root._further_mcp_console.level == logging.DEBUG
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
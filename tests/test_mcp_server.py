@@ -31,3 +31,92 @@ async def test_discover_books_tool(monkeypatch):
 
     result = await mcp_server.discover_books("ai", sources=["gutendex"], limit=1)
     assert result["query"] == "ai"
+
+
+@pytest.mark.asyncio
+async def test_lifespan_closes_shared_client():
+    from fastmcp import Client
+
+    from further_mcp import clients
+
+    shared = clients.get_shared_client()
+    async with Client(mcp_server.MCP_APP):
+        pass
+
+    assert shared.is_closed
+    assert clients.get_shared_client() is not shared
+
+
+def test_list_ebooks_skips_directories_and_matches_case(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    (root / "unpacked.epub").mkdir(parents=True)
+    (root / "LOUD.EPUB").write_text("ebook")
+    (root / "notes.txt").write_text("text")
+
+    monkeypatch.setattr(mcp_server, "ROOT_PATH", root)
+    result = mcp_server.list_ebooks()
+
+    assert result["epub"] == ["LOUD.EPUB"]
+    assert result["pdf"] == []
+
+
+def test_resolve_path_rejects_sibling_prefix_and_symlink_escape(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    root.mkdir()
+    (root / "book.epub").write_text("ebook")
+    sibling = tmp_path / "library-private"
+    sibling.mkdir()
+    (sibling / "secret.pdf").write_text("pdf")
+    (root / "link.pdf").symlink_to(sibling / "secret.pdf")
+
+    monkeypatch.setattr(mcp_server, "ROOT_PATH", root)
+
+    assert mcp_server._resolve_path("book.epub") == root / "book.epub"
+    for escape in ("../library-private/secret.pdf", "link.pdf"):
+        with pytest.raises(FileNotFoundError, match="not allowed"):
+            mcp_server._resolve_path(escape)
+    with pytest.raises(FileNotFoundError, match="does not exist"):
+        mcp_server._resolve_path("missing.epub")
+
+
+def test_resolve_path_hides_what_exists_outside_root(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    root.mkdir()
+    (root / "book.epub").write_text("ebook")
+    (tmp_path / "present.pdf").write_text("pdf")
+    (root / "loop").symlink_to(root / "loop")
+
+    monkeypatch.setattr(mcp_server, "ROOT_PATH", root)
+
+    for outside in ("../present.pdf", "../absent.pdf"):
+        with pytest.raises(FileNotFoundError, match="not allowed"):
+            mcp_server._resolve_path(outside)
+    for broken in ("book.epub/chapter", "loop"):
+        with pytest.raises(FileNotFoundError, match="does not exist"):
+            mcp_server._resolve_path(broken)
+
+
+def test_importing_server_defers_heavy_parsers():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, further_mcp.mcp_server; "
+        "print(','.join(m for m in ('fitz', 'pymupdf', 'ebooklib', 'bs4', 'html2text') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+
+def test_root_path_follows_ebook_root_env(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    code = "from further_mcp import mcp_server; print(mcp_server.ROOT_PATH)"
+    env = {**os.environ, "EBOOK_ROOT_PATH": str(tmp_path / "shelf")}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+
+    assert result.stdout.strip() == str((tmp_path / "shelf").resolve())
+    assert (tmp_path / "shelf").is_dir()
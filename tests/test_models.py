@@ -0,0 +1,17 @@
+from further_mcp.models import BookDetails, OpenLibrary
+
+
+def test_book_details_unwraps_list_fields_and_cleans_title():
+    book = BookDetails(author_name=["Ada", "Bob"], author_key=[], language=["en", "fr"], title="  Dune ")
+
+    assert book.author_name == "Ada"
+    assert book.author_key is None
+    assert book.language == "en"
+    assert book.title == "Dune"
+
+
+def test_open_library_validates_docs():
+    result = OpenLibrary(q="dune", docs=[{"title": 1965, "author_key": ["OL1A"], "unknown": True}])
+
+    assert result.docs[0].title == "1965"
+    assert result.docs[0].author_key == "OL1A"
@@ -0,0 +1,362 @@
+import inspect
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from further_mcp.tools import pdf_helper
+
+
+@pytest.fixture(autouse=True)
+def _clear_document_cache():
+    pdf_helper.clear_cache()
+    yield
+    pdf_helper.clear_cache()
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    doc = fitz.open()
+    for index in range(1, 7):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {index} body")
+    path = tmp_path / "sample.pdf"
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def page_pool(monkeypatch):
+    monkeypatch.setattr(pdf_helper.os, "cpu_count", lambda: 3)
+    monkeypatch.setattr(pdf_helper, "_PAGE_POOL", None)
+    monkeypatch.setitem(pdf_helper.PAGE_EXTRACTION_RULES, "sequential_max_pages", 1)
+    monkeypatch.setitem(pdf_helper.PAGE_EXTRACTION_RULES, "batch_size", 2)
+    yield
+    if pdf_helper._PAGE_POOL is not None:
+        pdf_helper._PAGE_POOL.shutdown()
+
+
+def test_small_requests_skip_the_pool(sample_pdf, monkeypatch):
+    monkeypatch.setattr(pdf_helper.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(pdf_helper, "_page_pool", lambda: pytest.fail("pool used for a small request"))
+
+    assert len(pdf_helper.extract_pages_text(sample_pdf, [1, 2, 3])) == 3
+
+
+def test_plan_page_batches_follows_rules(monkeypatch):
+    monkeypatch.setattr(pdf_helper.os, "cpu_count", lambda: 4)
+
+    assert pdf_helper._plan_page_batches(list(range(1, 11))) is None
+    assert [len(batch) for batch in pdf_helper._plan_page_batches(list(range(1, 26)))] == [10, 10, 5]
+    assert [len(batch) for batch in pdf_helper._plan_page_batches(list(range(1, 402)))] == [101, 101, 101, 98]
+
+
+def test_extract_pages_text_keeps_page_order(sample_pdf, page_pool):
+    texts = pdf_helper.extract_pages_text(sample_pdf, [1, 2, 3, 4, 5, 6])
+
+    assert [text.strip() for text in texts] == [f"Page {index} body" for index in range(1, 7)]
+    assert texts[2] == pdf_helper.extract_page_text(sample_pdf, 3)
+
+
+def test_extract_pages_text_wraps_bad_page_numbers(sample_pdf, page_pool):
+    with pytest.raises(pdf_helper.PdfProcessingError):
+        pdf_helper.extract_pages_text(sample_pdf, [1, 99])
+
+
+def test_documents_are_opened_once_until_the_file_changes(sample_pdf, monkeypatch):
+    opened = []
+    real_open = fitz.open
+
+    def counting_open(*args, **kwargs):
+        doc = real_open(*args, **kwargs)
+        opened.append(doc)
+        return doc
+
+    monkeypatch.setattr(fitz, "open", counting_open)
+
+    assert pdf_helper.get_meta(sample_pdf)["pages"] == 6
+    pdf_helper.get_toc(sample_pdf)
+    pdf_helper.extract_page_text(sample_pdf, 2)
+    pdf_helper.extract_page_markdown(sample_pdf, 3)
+    assert len(opened) == 1
+
+    stat = os.stat(sample_pdf)
+    os.utime(sample_pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    pdf_helper.extract_page_text(sample_pdf, 1)
+    assert len(opened) == 2
+    assert opened[0].is_closed
+    assert len(pdf_helper._DOC_CACHE) == 1
+
+
+def test_document_cache_is_bounded(sample_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_helper, "_DOC_CACHE_SIZE", 2)
+    for index in range(3):
+        copy = tmp_path / f"copy{index}.pdf"
+        copy.write_bytes(open(sample_pdf, "rb").read())
+        pdf_helper.extract_page_text(str(copy), 1)
+
+    assert len(pdf_helper._DOC_CACHE) == 2
+
+
+def test_unrelated_documents_are_read_concurrently(sample_pdf, tmp_path):
+    other = tmp_path / "other.pdf"
+    other.write_bytes(open(sample_pdf, "rb").read())
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pdf_helper._open_document(sample_pdf):
+            future = executor.submit(pdf_helper.extract_page_text, str(other), 1)
+            assert future.result(timeout=5).strip() == "Page 1 body"
+
+
+def test_evicted_document_is_closed_after_its_reader_finishes(sample_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_helper, "_DOC_CACHE_SIZE", 1)
+    other = tmp_path / "other.pdf"
+    other.write_bytes(open(sample_pdf, "rb").read())
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pdf_helper._open_document(sample_pdf) as doc:
+            future = executor.submit(pdf_helper.extract_page_text, str(other), 1)
+            with pytest.raises(TimeoutError):
+                future.result(timeout=0.2)
+            assert doc[0].get_text().strip() == "Page 1 body"
+        assert future.result(timeout=5).strip() == "Page 1 body"
+    assert doc.is_closed
+
+
+def test_extract_chapter_by_title_uses_toc_range(tmp_path):
+    doc = fitz.open()
+    for index in range(1, 6):
+        doc.new_page().insert_text((72, 72), f"Page {index}")
+    doc.set_toc([[1, "Intro", 1], [1, "Middle", 2], [1, "End", 4]])
+    path = tmp_path / "toc.pdf"
+    doc.save(path)
+    doc.close()
+
+    text, pages = pdf_helper.extract_chapter_by_title(str(path), "middle")
+
+    assert pages == [2, 3]
+    assert [line.strip() for line in text.splitlines() if line.strip()] == ["Page 2", "Page 3"]
+
+
+def test_extract_chapter_by_title_matches_casefolded_titles(tmp_path):
+    doc = fitz.open()
+    for index in range(1, 4):
+        doc.new_page().insert_text((72, 72), f"Page {index}")
+    doc.set_toc([[1, "Vorwort", 1], [1, "Die Straße", 2]])
+    path = tmp_path / "folded.pdf"
+    doc.save(path)
+    doc.close()
+
+    _, pages = pdf_helper.extract_chapter_by_title(str(path), "STRASSE")
+
+    assert pages == [2]
+
+
+def test_meta_and_toc_are_memoized_until_the_file_changes(sample_pdf, monkeypatch):
+    calls = []
+    real_open_document = pdf_helper._open_document
+
+    def counting_open_document(path, *args):
+        calls.append(path)
+        return real_open_document(path, *args)
+
+    monkeypatch.setattr(pdf_helper, "_open_document", counting_open_document)
+
+    first = pdf_helper.get_meta(sample_pdf)
+    first["pages"] = -1
+    assert pdf_helper.get_meta(sample_pdf)["pages"] == 6
+    assert pdf_helper.get_toc(sample_pdf) == pdf_helper.get_toc(sample_pdf)
+    assert len(calls) == 2
+
+    stat = os.stat(sample_pdf)
+    os.utime(sample_pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    pdf_helper.get_meta(sample_pdf)
+    assert len(calls) == 3
+
+
+def test_cached_calls_stat_the_file_once(sample_pdf, monkeypatch):
+    pdf_helper.get_toc(sample_pdf)
+    pdf_helper.extract_page_text(sample_pdf, 1)
+    stats = []
+    real_stat = os.stat
+
+    def counting_stat(path, *args, **kwargs):
+        stats.append(path)
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_helper.os, "stat", counting_stat)
+
+    pdf_helper.get_toc(sample_pdf)
+    pdf_helper.extract_page_text(sample_pdf, 1)
+
+    assert stats == [sample_pdf, sample_pdf]
+
+
+def test_uncached_meta_and_toc_stat_the_file_once(sample_pdf, monkeypatch):
+    # Open the document up front: fitz.open does its own existence checks.
+    pdf_helper.extract_page_text(sample_pdf, 1)
+    stats = []
+    real_stat = os.stat
+
+    def counting_stat(path, *args, **kwargs):
+        stats.append(path)
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_helper.os, "stat", counting_stat)
+
+    meta = pdf_helper.get_meta(sample_pdf)
+    pdf_helper.get_toc(sample_pdf)
+
+    assert meta["file_size"] == real_stat(sample_pdf).st_size
+
+    assert stats == [sample_pdf, sample_pdf]
+
+
+def test_missing_pdf_raises_file_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError, match="PDF file not found"):
+        pdf_helper.extract_page_text(str(tmp_path / "missing.pdf"), 1)
+
+
+def test_get_meta_can_skip_page_layout(sample_pdf):
+    meta = pdf_helper.get_meta(sample_pdf, include_layout=False)
+
+    assert meta["pages"] == 6
+    assert "page_width" not in meta
+    assert pdf_helper.get_meta(sample_pdf)["page_width"] > 0
+
+
+def test_long_chapters_use_the_page_pool(tmp_path, page_pool):
+    doc = fitz.open()
+    for index in range(1, 8):
+        doc.new_page().insert_text((72, 72), f"Page {index}")
+    doc.set_toc([[1, "Body", 1], [1, "Appendix", 7]])
+    path = tmp_path / "long.pdf"
+    doc.save(path)
+    doc.close()
+
+    text, pages = pdf_helper.extract_chapter_by_title(str(path), "body")
+
+    assert pages == [1, 2, 3, 4, 5, 6]
+    assert pdf_helper._PAGE_POOL is not None
+    assert [line.strip() for line in text.splitlines() if line.strip()] == [f"Page {index}" for index in pages]
+
+
+def test_extract_pages_markdown_matches_single_page_output(sample_pdf, page_pool):
+    pages = [5, 1, 3, 2]
+
+    markdown = pdf_helper.extract_pages_markdown(sample_pdf, pages)
+
+    assert pdf_helper._PAGE_POOL is not None
+    assert list(markdown) == pages
+    assert markdown == {page: pdf_helper.extract_page_markdown(sample_pdf, page) for page in pages}
+
+
+def test_pool_workers_do_not_start_a_nested_pool(page_pool):
+    with ProcessPoolExecutor(max_workers=1, initializer=pdf_helper.mark_pool_worker) as outer:
+        assert outer.submit(pdf_helper._plan_page_batches, list(range(1, 50))).result() is None
+        with pytest.raises(RuntimeError, match="pool worker"):
+            outer.submit(pdf_helper._page_pool).result()
+
+
+def test_other_child_processes_still_use_the_pool(page_pool):
+    # Stands in for uvicorn --workers/--reload processes, which are children too. Forked, so the
+    # patched pool settings carry over.
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as server_worker:
+        assert server_worker.submit(pdf_helper._plan_page_batches, list(range(1, 5))).result() == [[1, 2], [3, 4]]
+
+
+def test_long_chapters_fan_out_without_holding_the_document(tmp_path, page_pool, monkeypatch):
+    doc = fitz.open()
+    for index in range(1, 8):
+        doc.new_page().insert_text((72, 72), f"Page {index}")
+    doc.set_toc([[1, "Body", 1], [1, "Appendix", 7]])
+    path = tmp_path / "long.pdf"
+    doc.save(path)
+    doc.close()
+
+    class ThreadPool:
+        # Other threads read the same document, which would block if the caller still held it.
+        def map(self, fn, *iterables):
+            executor = ThreadPoolExecutor(max_workers=2)
+            try:
+                return list(executor.map(fn, *iterables, timeout=5))
+            finally:
+                executor.shutdown(wait=False)
+
+    monkeypatch.setattr(pdf_helper, "_page_pool", ThreadPool)
+
+    text, pages = pdf_helper.extract_chapter_by_title(str(path), "body")
+
+    assert pages == [1, 2, 3, 4, 5, 6]
+    assert [line.strip() for line in text.splitlines() if line.strip()] == [f"Page {index}" for index in pages]
+
+
+def test_get_all_pdf_files_matches_suffix_case_insensitively(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+    (tmp_path / "B.PDF").write_bytes(b"%PDF")
+    (tmp_path / "folder.pdf").mkdir()
+    (tmp_path / "pdf").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("x")
+
+    assert sorted(pdf_helper.get_all_pdf_files(str(tmp_path))) == ["B.PDF", "a.pdf"]
+
+
+def test_extract_page_markdown_marks_headings_bold_and_italic(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Heading", fontsize=18, fontname="hebo")
+    page.insert_text((72, 100), "strong", fontsize=11, fontname="hebo")
+    page.insert_text((72, 120), "body", fontsize=11, fontname="helv")
+    page.insert_text((72, 140), "slanted", fontsize=11, fontname="heit")
+    page.insert_text((72, 160), "code", fontsize=11, fontname="cour")
+    path = tmp_path / "styled.pdf"
+    doc.save(path)
+    doc.close()
+
+    markdown = pdf_helper.extract_page_markdown(str(path), 1)
+
+    assert markdown.splitlines() == ["## Heading", "**strong**", "body", "*slanted*", "code"]
+
+
+def test_extract_page_markdown_skips_image_blocks(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image((50, 200, 250, 400), pixmap=fitz.Pixmap(fitz.csRGB, (0, 0, 64, 64), False))
+    page.insert_text((72, 72), "caption", fontsize=11)
+    path = tmp_path / "image.pdf"
+    doc.save(path)
+    doc.close()
+
+    assert pdf_helper.extract_page_markdown(str(path), 1) == "caption"
+
+
+def test_iter_pdf_files_is_lazy(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+
+    files = pdf_helper.iter_pdf_files(str(tmp_path))
+
+    assert not isinstance(files, list)
+    assert list(files) == ["a.pdf"]
+
+
+def test_pdf_listing_is_logged_on_the_eager_wrapper():
+    # A logging wrapper on the generator would report completion before any scanning happens.
+    assert inspect.isgeneratorfunction(pdf_helper.iter_pdf_files)
+    assert hasattr(pdf_helper.get_all_pdf_files, "__wrapped__")
+
+
+def test_fork_reset_replaces_held_locks(monkeypatch):
+    held = threading.Lock()
+    held.acquire()
+    monkeypatch.setattr(pdf_helper, "_DOC_LOCK", held)
+    monkeypatch.setattr(pdf_helper, "_RESULT_LOCK", held)
+    monkeypatch.setattr(pdf_helper, "_DOC_CACHE", pdf_helper._DOC_CACHE)
+
+    pdf_helper._reset_after_fork()
+
+    assert not pdf_helper._DOC_LOCK.locked()
+    assert not pdf_helper._RESULT_LOCK.locked()
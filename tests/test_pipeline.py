@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from further_mcp import pipeline
+
+
+@pytest.mark.asyncio
+async def test_download_book_streams_to_disk(tmp_path):
+    payload = b"%PDF" + b"x" * (pipeline.DOWNLOAD_CHUNK_SIZE + 10)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=payload, headers={"content-type": "application/pdf"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        file_path = await pipeline.download_book("https://books.test/files/guide.pdf", tmp_path, client=client)
+
+    assert file_path.parent == tmp_path / "downloaded"
+    assert file_path.name.endswith("_guide.pdf")
+    assert file_path.read_bytes() == payload
+
+
+@pytest.mark.asyncio
+async def test_download_book_raises_on_http_error(tmp_path):
+    transport = httpx.MockTransport(lambda request: httpx.Response(404))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await pipeline.download_book("https://books.test/missing.epub", tmp_path, client=client)
+
+
+@pytest.mark.asyncio
+async def test_download_book_removes_partial_file_on_failure(tmp_path):
+    async def broken_body():
+        yield b"%PDF" + b"x" * 100
+        raise httpx.ReadError("connection dropped")
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=broken_body()))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.ReadError):
+            await pipeline.download_book("https://books.test/files/guide.pdf", tmp_path, client=client)
+
+    assert list((tmp_path / "downloaded").iterdir()) == []
+
+
+def test_parse_book_reads_pdf_pages_from_one_open_document(tmp_path, monkeypatch):
+    import fitz
+
+    doc = fitz.open()
+    for index in range(1, 5):
+        doc.new_page().insert_text((72, 72), f"Page {index}")
+    path = tmp_path / "book.pdf"
+    doc.save(path)
+    doc.close()
+
+    opened = []
+    real_open = fitz.open
+
+    def counting_open(*args, **kwargs):
+        opened.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(fitz, "open", counting_open)
+    result = pipeline.parse_book(path, limit_pages=3)
+
+    assert result["format"] == "pdf"
+    assert result["summary"].split("\n\n") == ["Page 1", "Page 2", "Page 3"]
+    assert len(opened) == 1
+
+
+def test_parse_book_reads_long_pdf_summaries_inline(tmp_path, monkeypatch):
+    import fitz
+
+    from further_mcp.tools import pdf_helper
+
+    doc = fitz.open()
+    for index in range(1, 13):
+        doc.new_page().insert_text((72, 72), f"Page {index}")
+    path = tmp_path / "long.pdf"
+    doc.save(path)
+    doc.close()
+
+    monkeypatch.setattr(pdf_helper.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(pdf_helper, "_page_pool", lambda: pytest.fail("parse_book started the page pool"))
+
+    result = pipeline.parse_book(path, limit_pages=12)
+
+    assert len(result["summary"].split("\n\n")) == 12
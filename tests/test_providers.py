@@ -1,6 +1,17 @@
+import httpx
+import pytest
+
+from further_mcp import providers
 from further_mcp.providers import OpenLibraryProvider
 
 
+@pytest.fixture(autouse=True)
+def _clear_provider_cache():
+    providers.clear_cache()
+    yield
+    providers.clear_cache()
+
+
 def test_build_query_normalizes_keywords():
     provider = OpenLibraryProvider()
     result = provider._build_query("Python", ["Introduction", "Updated", "Python"])
@@ -12,3 +23,63 @@ def test_build_query_ignores_empty_keywords():
     result = provider._build_query("Python", ["", "   ", "Updated"])
     assert "updated" not in result
     assert "latest" in result
+
+
+@pytest.mark.asyncio
+async def test_get_json_is_cached_per_path_and_params():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"numFound": 0, "docs": []})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = OpenLibraryProvider(base_url="https://ol.test", client=client)
+        first = await provider.search_books("dune", limit=1)
+        second = await provider.search_books("dune", limit=1)
+        await provider.search_books("dune", limit=2)
+
+    assert first.q == second.q == "dune"
+    assert len(calls) == 2
+
+
+def test_provider_falls_back_to_shared_client():
+    from further_mcp.clients import get_shared_client
+
+    assert OpenLibraryProvider().client is get_shared_client()
+
+
+def test_build_query_without_keywords_maps_synonyms():
+    provider = OpenLibraryProvider()
+    assert provider._build_query("  Intro ") == "introduction"
+    assert provider._build_query("Deep Learning") == "deep learning"
+    assert provider._build_query("   ") == ""
+
+
+@pytest.mark.asyncio
+async def test_author_details_and_works_are_fetched_concurrently():
+    import asyncio
+
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        path = request.url.path
+        if path == "/search.json":
+            return httpx.Response(200, json={"docs": [{"title": "Dune", "author_key": ["OL1A"]}]})
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if path.endswith("/works.json"):
+            return httpx.Response(200, json={"entries": [{"title": "Dune"}]})
+        return httpx.Response(200, json={"key": "/authors/OL1A", "name": "Frank Herbert"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = OpenLibraryProvider(base_url="https://ol.test", client=client)
+        author = await provider.search_author_with_book_name("dune")
+
+    assert author.name == "Frank Herbert"
+    assert [work.title for work in author.works] == ["Dune"]
+    assert peak == 2